@@ -6,6 +6,11 @@ import argparse
 sys.path.append("../GeneQuest")
 import genequest
 from genequest.io_handler.parser import FastaReader
+from genequest.io_handler.fastq import FastqReader, is_fastq
+from genequest.analysis.assembler import run_de_bruijn
+from genequest.analysis.recruitment import recruit_reads
+from genequest.analysis.alignment import run_local_alignment
+from genequest.analysis.seed_index import SeedIndex
 # from genequest.io.parser import FastaReader
 
 if __name__ == '__main__':
@@ -16,40 +21,96 @@ if __name__ == '__main__':
     optional = parser.add_argument_group("Optional arguments")
 
     # required arguments
-    required.add_argument("-r" "--reads", type=str, required=True,
-                        help="FASTA file containg reads")
+    required.add_argument("-r", "--reads", type=str, required=True,
+                        help="FASTA or FASTQ file containg reads (plain, gzip or BGZF)")
     required.add_argument("-q", "--gene_query", type=str, required=True,
                         help="FASTA file gene of interest")
 
     # optional arguments
-    # NOTE: these are not used yet. Used for alignment only
+    # NOTE: assembly and alignment parameters
     optional.add_argument("-k", "--kmer_size", type=int, required=False, default=3,
                           help="size of the sequence fragments")
     optional.add_argument("-ms", "--match_score", type=int, required=False, default=10,
                           help="Score applied for matching nucleotide")
     optional.add_argument("-gs", "--gap_score", type=int, required=False, default=0,
                           help="Penalty score applied for gaps")
+    optional.add_argument("-go", "--gap_open", type=int, required=False, default=None,
+                          help="Penalty score applied for opening a gap (affine gaps, requires --gap_extend)")
+    optional.add_argument("-ge", "--gap_extend", type=int, required=False, default=None,
+                          help="Penalty score applied for extending a gap (affine gaps, requires --gap_open)")
     optional.add_argument("-mis", "--mistmatch_score", type=int, required=False, default=-5,
                           help="Penalty score applied for nucleotide mismatch")
+    optional.add_argument("-w", "--workers", type=int, required=False, default=1,
+                          help="Number of processes used to assemble scaffolds in parallel")
+    optional.add_argument("-t", "--threads", type=int, required=False, default=1,
+                          help="Number of processes used to align contigs in parallel")
+    optional.add_argument("-n", "--top_n", type=int, required=False, default=None,
+                          help="Number of best contig alignments to keep")
+    optional.add_argument("-rc", "--recruit", action="store_true",
+                          help="Only assembles the reads sharing minimizers with the query")
+    optional.add_argument("-c", "--cache_dir", type=str, required=False, default=None,
+                          help="Directory caching assembled scaffolds between runs")
+    optional.add_argument("-tq", "--trim_quality", type=int, required=False, default=None,
+                          help="Trims FASTQ reads at the first 4 base window below this mean quality")
+    optional.add_argument("-s", "--seed_size", type=int, required=False, default=None,
+                          help="Only aligns the contigs sharing seeds of this size with the query")
 
     args = parser.parse_args()
+    if (args.gap_open is None) != (args.gap_extend is None):
+        parser.error("--gap_open and --gap_extend must be used together")
+    if args.top_n is not None and args.top_n < 1:
+        parser.error("--top_n must be at least 1")
+    if args.seed_size is not None and args.seed_size < 1:
+        parser.error("--seed_size must be at least 1")
+
+    reads_fastq = is_fastq(args.reads)
+    if args.trim_quality is not None and not reads_fastq:
+        parser.error("--trim_quality requires FASTQ reads")
 
     # parsing fasta file containg reads and gene query
     # -- printing sequence information
-    reads = FastaReader(args.reads)
+    # -- trimmed FASTQ reads must stay longer than the kmer size
+    if reads_fastq:
+        reads = FastqReader(args.reads, min_quality=args.trim_quality,
+                            min_length=args.kmer_size + 1)
+    else:
+        reads = FastaReader(args.reads)
     gene_query = FastaReader(args.gene_query)
 
     print("Loaded Sequence information:")
     print("query sequence length: {}".format(len(gene_query)))
     print("total number of reads: {}".format(len(reads)))
 
+    # keeping the reads related to the query gene
+    if args.recruit:
+        reads = recruit_reads(gene_query[0].seq, reads)
+        print("total number of recruited reads: {}".format(len(reads)))
+        if len(reads) == 0:
+            sys.exit("no reads share minimizers with the query, nothing to assemble")
+
     # assemble the genome
     # -- group the geomes based on scaffold_id
     # -- apply the run_de_brujin() function
+    contigs = run_de_bruijn(reads, args.kmer_size, workers=args.workers,
+                            cache=args.cache_dir)
+    print("total number of assembled scaffolds: {}".format(len(contigs)))
+
+    # keeping the contigs sharing seeds with the query gene
+    if args.seed_size is not None:
+        seed_index = SeedIndex.from_contigs(contigs, k=args.seed_size)
+        contigs = seed_index.candidate_contigs(gene_query[0].seq)
+        n_candidates = sum([len(scaffold) for scaffold in contigs.values()])
+        print("total number of candidate contigs: {}".format(n_candidates))
 
     # next step is the alignment
-    # -- iterate all generated contigs into the run_local_alignment(query, contig)
-        # returns alignment score a positional alignment data
+    # -- aligning the query against all generated contigs
+    # -- returns alignment score a positional alignment data
+    alignments = run_local_alignment(gene_query[0].seq, contigs, top_n=args.top_n,
+                                     match=args.match_score, mismatch=args.mistmatch_score,
+                                     gap=args.gap_score, gap_open=args.gap_open,
+                                     gap_extend=args.gap_extend, threads=args.threads)
+    print("best alignments:")
+    print(alignments.head().to_string(index=False))
 
     # write out the results
 
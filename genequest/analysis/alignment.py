@@ -6,9 +6,48 @@
 # Module containing functions for local sequence
 # alignment
 # ------------------------------
+import os
+import heapq
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 
+# genequest imports
+from genequest.analysis.kmer_counter import sequence_kmers
+
+# largest score that can be stored in the compact (int16) score rows
+INT16_MAX = np.iinfo(np.int16).max
+
+# moves stored in the direction matrix
+# -- STOP: the alignment starts after this cell
+# -- DIAG: match or mismatch, comes from (i - 1, j - 1)
+# -- UP: gap in the query, comes from (i - 1, j)
+# -- LEFT: gap in the contig, comes from (i, j - 1)
+STOP, DIAG, UP, LEFT = 0, 1, 2, 3
+
+# CIGAR operation of each move, the contig is used as reference
+CIGAR_OPS = {DIAG: "M", UP: "D", LEFT: "I"}
+
+# columns of the run_local_alignment() result table
+RESULT_COLUMNS = [
+    "scaffold",
+    "contig_id",
+    "contig_beg",
+    "contig_end",
+    "query_beg",
+    "query_end",
+    "score",
+    "cigar",
+]
+
+# summary of a traced back alignment
+# -- positions are 0-based and end exclusive: contig[contig_beg:contig_end]
+Alignment = namedtuple(
+    "Alignment",
+    ["contig_beg", "contig_end", "query_beg", "query_end", "score", "cigar"],
+)
+
 
 def generate_scoring_matrix(n_rows, n_cols):
     """Generates a zero-matrix
@@ -24,98 +63,209 @@ def generate_scoring_matrix(n_rows, n_cols):
     return matrix
 
 
-def trace_back(score_matrix: np.ndarray) -> list:
+def trace_back(
+    score_matrix: np.ndarray,
+    directions=None,
+    gap=None,
+    query=None,
+    contig=None,
+    match=None,
+    mismatch=None,
+) -> tuple:
+    """Traces back the best local alignment by following the moves stored in
+    a direction matrix, starting from the highest score of the matrix.
+
+    Parameters
+    ----------
+    score_matrix : np.ndarray
+        local alignment scoring matrix
+    directions : np.ndarray, optional
+        uint8 direction matrix returned by score_alignment() with
+        return_directions=True. If None, it is inferred from the scoring
+        matrix (see infer_directions()), by default None
+    gap : int, optional
+        gap score used to build the matrix, required when the directions are
+        inferred, by default None
+    query : str, optional
+        sequence placed along the columns. When the directions are inferred
+        with the sequences, the traceback follows the same path as with the
+        recorded directions, otherwise gaps are preferred on ties (see
+        infer_directions()), by default None
+    contig : str, optional
+        sequence placed along the rows, by default None
+    match : int, optional
+        matching score used to build the matrix, required when the
+        directions are inferred with the sequences, by default None
+    mismatch : int, optional
+        mismatch score used to build the matrix, required when the
+        directions are inferred with the sequences, by default None
+
+    Returns
+    -------
+    tuple
+        positions, scores of the traced back cells. The last position is the
+        cell the alignment starts after (score of 0)
+
+    Raises
+    ------
+    ValueError
+        raised if the directions are inferred without the scores used to
+        build the matrix
     """
+    if directions is None:
+        directions = infer_directions(score_matrix, gap, query, contig, match, mismatch)
+
+    # search index position in the matrix that contains the highest score
+    x, y = np.unravel_index(score_matrix.argmax(), shape=score_matrix.shape)
+    positions, _ = _walk_directions(directions, int(x), int(y))
+
+    xs, ys = zip(*positions)
+    score_list = score_matrix[list(xs), list(ys)].tolist()
+    return (positions, score_list)
+
+
+def trace_alignment(score_matrix: np.ndarray, directions: np.ndarray) -> Alignment:
+    """Traces back the best local alignment and summarizes it
 
     Parameters
     ----------
-    query : str
-        query sequence
-    contig : str
-        contig seq
     score_matrix : np.ndarray
+        local alignment scoring matrix
+    directions : np.ndarray
+        uint8 direction matrix returned by score_alignment() with
+        return_directions=True
+
+    Returns
+    -------
+    Alignment
+        start and end positions in both sequences, alignment score and CIGAR
+        string (e.g. 12M2I30M)
+    """
+    x, y = np.unravel_index(score_matrix.argmax(), shape=score_matrix.shape)
+    positions, moves = _walk_directions(directions, int(x), int(y))
+    contig_beg, query_beg = positions[-1]
+
+    return Alignment(
+        contig_beg=contig_beg,
+        contig_end=int(x),
+        query_beg=query_beg,
+        query_end=int(y),
+        score=float(score_matrix[x, y]),
+        cigar=_moves_to_cigar(moves),
+    )
 
 
+def infer_directions(
+    score_matrix: np.ndarray,
+    gap: int,
+    query=None,
+    contig=None,
+    match=None,
+    mismatch=None,
+) -> np.ndarray:
+    """Infers the direction matrix of a linear gap scoring matrix.
+
+    When the sequences are given, moves are tested in the same order as
+    score_alignment() records them (diagonal, then up, then left) and the
+    diagonal is checked against its exact substitution score, so the
+    inferred directions are the recorded ones.
+
+    Without the sequences, the substitution score of a cell is unknown and
+    only gap moves can be verified from the scores: a cell is considered a
+    gap if its score can be obtained from its upper or left neighbor,
+    otherwise it is a diagonal move. On ties this prefers gaps, so the path
+    can differ from the recorded directions while having the same score.
+
+    Parameters
+    ----------
+    score_matrix : np.ndarray
+        local alignment scoring matrix
+    gap : int
+        gap score used to build the matrix
+    query : str, optional
+        sequence placed along the columns, by default None
+    contig : str, optional
+        sequence placed along the rows, by default None
+    match : int, optional
+        matching score used to build the matrix, required with the
+        sequences, by default None
+    mismatch : int, optional
+        mismatch score used to build the matrix, required with the
+        sequences, by default None
+
     Returns
     -------
-    list
-        list containing contig_start, contig_end, query_start,
-        query_end, alignment score
+    np.ndarray
+        uint8 direction matrix
+
+    Raises
+    ------
+    ValueError
+        raised if gap is None, or if the sequences are given without match
+        and mismatch
     """
+    if gap is None:
+        raise ValueError("gap must be given to infer the directions")
 
-    # initialize score and position tacker
-    score = None
-    track_back = []
-    score_list = []
+    directions = np.zeros(score_matrix.shape, dtype=np.uint8)
+    cells = score_matrix[1:, 1:]
+    is_up = cells == score_matrix[:-1, 1:] + gap
+    if query is None or contig is None:
+        directions[1:, 1:] = np.select(
+            [cells == 0, is_up, cells == score_matrix[1:, :-1] + gap],
+            [STOP, UP, LEFT],
+            DIAG,
+        )
+        return directions
 
-    # search index position in the matrix that contains the highest score
-    start_x_pos, start_y_pos = np.unravel_index(
-        score_matrix.argmax(), shape=score_matrix.shape
+    if match is None or mismatch is None:
+        raise ValueError("match and mismatch must be given to infer the directions")
+
+    (query_codes, contig_codes), n_symbols = encode_symbols(query, contig)
+    profile = substitution_profile(query_codes, n_symbols, match, mismatch)
+    is_diag = cells == score_matrix[:-1, :-1] + profile[contig_codes]
+    directions[1:, 1:] = np.select(
+        [cells == 0, is_diag, is_up],
+        [STOP, DIAG, UP],
+        LEFT,
     )
-    top_score = score_matrix[start_x_pos, start_y_pos]
-    score = top_score
-    track_back.append((start_x_pos, start_y_pos))
-    score_list.append(top_score)
-
-    # trace back by searching for the next score repeat until score == 0
-    x = start_x_pos
-    y = start_y_pos
-    while score > 0:
-        tracker = {}
-
-        # getting values from scoring matrix
-        left_pos = score_matrix[x - 1, y]
-        up_pos = score_matrix[x, y - 1]
-        diag_pos = score_matrix[x - 1, y - 1]
-
-        # priority conditions
-        # -- Top: want to prioritize diagonal position
-        # -- second prior: want to prioritize which positions has the second highest score
-        if diag_pos == left_pos and diag_pos == up_pos:
-            left_pos = left_pos - 0.1
-            up_pos = up_pos - 0.1
-        elif diag_pos == left_pos:
-            up_pos = left_pos - 0.1
-        elif diag_pos == up_pos:
-            up_pos = up_pos - 0.1
-        elif up_pos == left_pos:
-            up_x, up_y = (x, y - 1)
-            up_max_score = max(
-                score_matrix[up_x, up_y - 1],
-                score_matrix[up_x - 1, up_y],
-                score_matrix[up_x - 1, up_y - 1],
-            )
+    return directions
 
-            left_x, left_y = (x - 1, y)
-            left_max_score = max(
-                score_matrix[left_x, left_y - 1],
-                score_matrix[left_x - 1, left_y],
-                score_matrix[left_x - 1, left_y - 1],
-            )
 
-            if up_max_score > left_max_score:
-                left_pos = left_pos - 0.1
-            else:
-                up_pos = up_pos - 0.1
-
-        # tracking values
-        tracker[f"{x-1}, {y}"] = left_pos
-        tracker[f"{x}, {y-1}"] = up_pos
-        tracker[f"{x-1}, {y-1}"] = diag_pos
-
-        # finding the max
-        max_score_key = max(tracker, key=tracker.get)
-        max_score = tracker[max_score_key]
-        score = max_score
-        score_list.append(max_score)
-
-        # setting new start position
-        pos = tuple(int(i) for i in max_score_key.split(","))
-        x = pos[0]
-        y = pos[1]
-        track_back.append((x, y))
+def _moves_to_cigar(moves: list) -> str:
+    """Run length encodes traced back moves (last move first) into a CIGAR
+    string in alignment order
+    """
+    cigar = []
+    count = 0
+    for idx, move in enumerate(reversed(moves)):
+        count += 1
+        if idx == len(moves) - 1 or moves[-idx - 2] != move:
+            cigar.append(f"{count}{CIGAR_OPS[move]}")
+            count = 0
+    return "".join(cigar)
 
-    return (track_back, score_list)
+
+def _walk_directions(directions: np.ndarray, x: int, y: int) -> tuple:
+    """Follows the moves of a direction matrix from (x, y) until a STOP cell
+    is reached. Returns the visited positions and the moves taken.
+    """
+    positions = [(x, y)]
+    moves = []
+    move = directions[x, y]
+    while move != STOP:
+        if move == DIAG:
+            x -= 1
+            y -= 1
+        elif move == UP:
+            x -= 1
+        else:
+            y -= 1
+        moves.append(int(move))
+        positions.append((x, y))
+        move = directions[x, y]
+
+    return positions, moves
 
 
 def parse_traceback_scores(traceback_data):
@@ -170,35 +320,691 @@ def match_scoring(nuc1, nuc2, match_score, mismatch_score):
         return mismatch_score
 
 
+def encode_symbols(*seqs) -> tuple:
+    """Converts sequences into integer codes that index a shared alphabet.
+    Characters are compared as they are, so the codes follow the same
+    matching rules as match_scoring()
+
+    Parameters
+    ----------
+    *seqs : str
+        sequences to encode
+
+    Returns
+    -------
+    tuple
+        (codes, n_symbols) list of int arrays (one per sequence) and the size
+        of the shared alphabet
+    """
+    raw_seqs = np.frombuffer("".join(seqs).encode(), dtype=np.uint8)
+    symbols, all_codes = np.unique(raw_seqs, return_inverse=True)
+    bounds = np.cumsum([len(seq.encode()) for seq in seqs])[:-1]
+    return np.split(all_codes, bounds), len(symbols)
+
+
+def substitution_profile(query_codes, n_symbols, match=10, mismatch=-4):
+    """Builds the substitution scores of every symbol against every position
+    of the query
+
+    Parameters
+    ----------
+    query_codes : np.ndarray
+        integer codes of the query (see encode_symbols())
+    n_symbols : int
+        size of the alphabet
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+
+    Returns
+    -------
+    np.ndarray
+        (n_symbols, len(query)) array where profile[s, j] is the score of
+        aligning symbol s against the j-th query nucleotide
+    """
+    same = np.arange(n_symbols)[:, None] == query_codes[None, :]
+    return np.where(same, match, mismatch).astype(np.float64)
+
+
 def score_alignment(
-    query: str, contig: str, gap=-5, match=10, mismatch=-4
+    query: str, contig: str, gap=-5, match=10, mismatch=-4, return_directions=False
 ) -> np.ndarray:
-    """Do a local alignment between x and y"""
+    """Do a local alignment between x and y. The matrix is filled one row at
+    a time: the diagonal and vertical moves of a row only depend on the
+    previous row and are computed in bulk, the horizontal gaps are then
+    resolved with a running maximum (prefix max) over the row.
+
+    Parameters
+    ----------
+    query : str
+        sequence placed along the columns
+    contig : str
+        sequence placed along the rows
+    gap : int, optional
+        gap score, by default -5
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+    return_directions : bool, optional
+        also returns the uint8 direction matrix used by trace_back(), by
+        default False
+
+    Returns
+    -------
+    np.ndarray, tuple
+        (len(contig) + 1, len(query) + 1) local alignment scoring matrix, or
+        (score_matrix, directions) if return_directions is True
+    """
 
     # create a zero-filled matrix
     score_matrix = generate_scoring_matrix(len(contig) + 1, len(query) + 1)
+    directions = None
+    if return_directions:
+        directions = np.zeros(score_matrix.shape, dtype=np.uint8)
+    if len(query) == 0 or len(contig) == 0:
+        return (score_matrix, directions) if return_directions else score_matrix
+
+    # substitution scores of each contig nucleotide against the whole query
+    (query_codes, contig_codes), n_symbols = encode_symbols(query, contig)
+    profile = substitution_profile(query_codes, n_symbols, match, mismatch)
+
+    _fill_alignment(score_matrix, directions, contig_codes, profile, gap)
+
+    if return_directions:
+        return (score_matrix, directions)
+    return score_matrix
+
+
+def _fill_alignment(score_matrix, directions, contig_codes, profile, gap):
+    """Fills a zero-initialized scoring matrix (and direction matrix if it is
+    not None) in place, see score_alignment()
+    """
+    # H[i, j] = max(H[i, j - 1] + gap, best[j]) unrolls into
+    # max over l <= j of (best[l] + gap * (j - l))
+    gap_steps = gap * np.arange(score_matrix.shape[1], dtype=np.float64)
 
     # populating matrix
+    for i in range(1, len(contig_codes) + 1):
+        prev_row = score_matrix[i - 1]
+        row = score_matrix[i]
+
+        # getting best score per row
+        # -- we are maximizing the score
+        diag_scores = prev_row[:-1] + profile[contig_codes[i - 1]]
+        up_scores = prev_row[1:] + gap
+        np.maximum(up_scores, diag_scores, out=row[1:])
+        np.maximum(row[1:], 0, out=row[1:])
+
+        # horizontal gaps
+        row -= gap_steps
+        np.maximum.accumulate(row, out=row)
+        row += gap_steps
+
+        # recording the move that produced each cell, diagonal moves first
+        if directions is not None:
+            cells = row[1:]
+            directions[i, 1:] = np.select(
+                [cells == 0, cells == diag_scores, cells == up_scores],
+                [STOP, DIAG, UP],
+                LEFT,
+            )
+
+
+def score_affine_alignment(
+    query: str, contig: str, gap_open=-5, gap_extend=-1, match=10, mismatch=-4
+) -> tuple:
+    """Do a local alignment between x and y with affine gap scores (Gotoh).
+    A gap of length n is scored as gap_open + (n - 1) * gap_extend. Three
+    matrices are filled: H holds the best score of every cell, E the best
+    score ending with a gap in the contig (horizontal move) and F the best
+    score ending with a gap in the query (vertical move).
+
+    Rows are filled the same way as score_alignment(): F only depends on the
+    previous row and E is resolved with a prefix max. Opening a gap right
+    after another gap is never better than extending it when
+    gap_extend >= gap_open, so E can be computed from the row scores before
+    the horizontal gaps are applied.
+
+    Parameters
+    ----------
+    query : str
+        sequence placed along the columns
+    contig : str
+        sequence placed along the rows
+    gap_open : int, optional
+        score of the first position of a gap, by default -5
+    gap_extend : int, optional
+        score of every following position of a gap, by default -1
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+
+    Returns
+    -------
+    tuple
+        (H, E, F) scoring matrices of shape (len(contig) + 1, len(query) + 1)
+
+    Raises
+    ------
+    ValueError
+        raised if gap_extend is smaller than gap_open
+    """
+    if gap_extend < gap_open:
+        raise ValueError("gap_extend must be greater or equal to gap_open")
+
+    n_rows, n_cols = len(contig) + 1, len(query) + 1
+    h_matrix = generate_scoring_matrix(n_rows, n_cols)
+    e_matrix = np.full((n_rows, n_cols), -np.inf)
+    f_matrix = np.full((n_rows, n_cols), -np.inf)
+    if len(query) == 0 or len(contig) == 0:
+        return (h_matrix, e_matrix, f_matrix)
+
+    (query_codes, contig_codes), n_symbols = encode_symbols(query, contig)
+    profile = substitution_profile(query_codes, n_symbols, match, mismatch)
+    _fill_affine_alignment(
+        h_matrix, e_matrix, f_matrix, contig_codes, profile, gap_open, gap_extend
+    )
+    return (h_matrix, e_matrix, f_matrix)
+
+
+def _fill_affine_alignment(
+    h_matrix, e_matrix, f_matrix, contig_codes, profile, gap_open, gap_extend
+):
+    """Fills affine scoring matrices in place, see score_affine_alignment().
+    H must be zero-initialized, E and F must be initialized to -inf.
+    """
+    n_cols = h_matrix.shape[1]
+    extend_steps = gap_extend * np.arange(n_cols, dtype=np.float64)
+
+    for i in range(1, len(contig_codes) + 1):
+        prev_h = h_matrix[i - 1]
+        h_row, e_row, f_row = h_matrix[i], e_matrix[i], f_matrix[i]
+
+        # vertical gaps are opened or extended from the previous row
+        open_scores = prev_h[1:] + gap_open
+        np.maximum(open_scores, f_matrix[i - 1, 1:] + gap_extend, out=f_row[1:])
+
+        # best score without horizontal gaps
+        diag_scores = prev_h[:-1] + profile[contig_codes[i - 1]]
+        np.maximum(diag_scores, f_row[1:], out=h_row[1:])
+        np.maximum(h_row[1:], 0, out=h_row[1:])
+
+        # horizontal gaps: E[j] = max over l < j of
+        # (H[l] + gap_open + gap_extend * (j - 1 - l))
+        np.maximum.accumulate(h_row[:-1] - extend_steps[:-1], out=e_row[1:])
+        e_row[1:] += gap_open + extend_steps[:-1]
+        np.maximum(h_row, e_row, out=h_row)
+
+
+def affine_trace_back(score_matrices: tuple, gap_open=-5, gap_extend=-1) -> tuple:
+    """Traces back the best local alignment across the three states of an
+    affine scoring (see score_affine_alignment()). When a cell can be
+    reached in multiple ways, gaps are followed before diagonal moves and
+    gaps are opened before they are extended.
+
+    Parameters
+    ----------
+    score_matrices : tuple
+        (H, E, F) scoring matrices
+    gap_open : int, optional
+        gap open score used to build the matrices, by default -5
+    gap_extend : int, optional
+        gap extend score used to build the matrices, by default -1
+
+    Returns
+    -------
+    tuple
+        positions, scores in the same format as trace_back(). Scores are the
+        values of the state the alignment is in at each position
+    """
+    h_matrix, e_matrix, f_matrix = score_matrices
+    state_matrices = {"H": h_matrix, "E": e_matrix, "F": f_matrix}
+
+    x, y = np.unravel_index(h_matrix.argmax(), shape=h_matrix.shape)
+    x, y = int(x), int(y)
+    state = "H"
+    score = h_matrix[x, y]
+    track_back = [(x, y)]
+    score_list = [score]
+    while score > 0:
+        if state == "H":
+            if score == e_matrix[x, y]:
+                state = "E"
+            elif score == f_matrix[x, y]:
+                state = "F"
+
+        # horizontal gap: opened from H or extended from E
+        if state == "E":
+            if e_matrix[x, y] == h_matrix[x, y - 1] + gap_open:
+                state = "H"
+            y -= 1
+
+        # vertical gap: opened from H or extended from F
+        elif state == "F":
+            if f_matrix[x, y] == h_matrix[x - 1, y] + gap_open:
+                state = "H"
+            x -= 1
+
+        # diagonal move
+        else:
+            x, y = x - 1, y - 1
+
+        score = state_matrices[state][x, y]
+        track_back.append((x, y))
+        score_list.append(score)
+
+    return (track_back, score_list)
+
+
+class QueryProfile:
+    """Substitution scores of a query against every symbol, computed once and
+    reused to scan many contigs. Symbols are the characters of the query, any
+    contig character that is not found in the query is mapped to an extra
+    symbol that always mismatches.
+
+    Scores are stored as int16 so a row of the scoring matrix is as compact
+    as possible, see best_alignment_score()
+
+    parameters
+    ----------
+    query : str
+        query sequence
+    gap : int, optional
+        gap score, by default -5
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+
+    methods
+    -------
+    encode_contig(contig):method converts a contig into profile row indices
+
+    Raises
+    ------
+    ValueError
+        raised if the scores are not integers
+    """
+
+    def __init__(self, query: str, gap=-5, match=10, mismatch=-4):
+        for score in (gap, match, mismatch):
+            if int(score) != score:
+                raise ValueError(f"query profile scores must be integers: {score}")
+
+        self.query = query
+        self.gap = int(gap)
+        self.match = int(match)
+        self.mismatch = int(mismatch)
+
+        query_bytes = np.frombuffer(query.encode(), dtype=np.uint8)
+        symbols, query_codes = np.unique(query_bytes, return_inverse=True)
+        self.lookup = np.full(256, len(symbols), dtype=np.intp)
+        self.lookup[symbols] = np.arange(len(symbols))
+        self.scores = substitution_profile(
+            query_codes, len(symbols) + 1, self.match, self.mismatch
+        ).astype(np.int64)
+
+        # horizontal gap offsets of the prefix max (see score_alignment())
+        self.gap_steps = self.gap * np.arange(len(query) + 1, dtype=np.int64)
+
+        # largest amount a row (shifted by gap_steps) can exceed the maximum
+        # of the previous row
+        self.max_increase = abs(self.match) + abs(self.gap) * (len(query) + 1)
+
+    def encode_contig(self, contig: str) -> np.ndarray:
+        """Converts a contig into the row indices of the profile scores"""
+        return self.lookup[np.frombuffer(contig.encode(), dtype=np.uint8)]
+
+    def __len__(self):
+        return len(self.query)
+
+    def __repr__(self):
+        scores = f"gap={self.gap}, match={self.match}, mismatch={self.mismatch}"
+        return f"QueryProfile(length={len(self.query)}, {scores})"
+
+
+def best_alignment_score(query, contig: str, gap=-5, match=10, mismatch=-4) -> tuple:
+    """Finds the best local alignment score between a query and a contig
+    without storing the scoring matrix. Only the previous and current rows
+    are kept, using int16 scores while they cannot overflow. Once a row gets
+    close to the int16 limit the remaining rows are computed with int64.
+
+    Scores and positions are the same as the maximum of score_alignment()
+
+    Parameters
+    ----------
+    query : str, QueryProfile
+        query sequence or its precomputed profile. When scanning many contigs,
+        the profile should be created once and reused
+    contig : str
+        contig sequence
+    gap : int, optional
+        gap score, by default -5. Ignored if query is a QueryProfile
+    match : int, optional
+        matching score, by default 10. Ignored if query is a QueryProfile
+    mismatch : int, optional
+        mismatch score, by default -4. Ignored if query is a QueryProfile
+
+    Returns
+    -------
+    tuple
+        (score, contig_end, query_end) best score and its position in the
+        scoring matrix. The first position in row order is returned if the
+        best score is found multiple times
+    """
+    if not isinstance(query, QueryProfile):
+        query = QueryProfile(query, gap, match, mismatch)
+
+    # using compact rows only if the first row cannot overflow
+    dtype = np.int16 if query.max_increase < INT16_MAX else np.int64
+    scores = query.scores.astype(dtype)
+    gap_steps = query.gap_steps.astype(dtype)
+    gap = dtype(query.gap)
+    zero = dtype(0)
+
+    prev_row = np.zeros(len(query) + 1, dtype=dtype)
+    row = np.zeros(len(query) + 1, dtype=dtype)
+    prev_max = 0
+    best = (0, 0, 0)
+    for i, code in enumerate(query.encode_contig(contig), start=1):
+
+        # falling back to full precision before the row can overflow
+        if dtype is np.int16 and prev_max + query.max_increase >= INT16_MAX:
+            dtype = np.int64
+            scores = query.scores
+            gap_steps = query.gap_steps
+            gap = dtype(query.gap)
+            zero = dtype(0)
+            prev_row = prev_row.astype(dtype)
+            row = row.astype(dtype)
+
+        diag_scores = prev_row[:-1] + scores[code]
+        np.maximum(prev_row[1:] + gap, diag_scores, out=row[1:])
+        np.maximum(row[1:], zero, out=row[1:])
+
+        # horizontal gaps
+        row -= gap_steps
+        np.maximum.accumulate(row, out=row)
+        row += gap_steps
+
+        j = int(row.argmax())
+        prev_max = int(row[j])
+        if prev_max > best[0]:
+            best = (prev_max, i, j)
+        prev_row, row = row, prev_row
+
+    return best
+
+
+def realign_best_region(query, contig: str, gap=-5, match=10, mismatch=-4) -> tuple:
+    """Traces back the best local alignment without computing the scoring
+    matrix of the whole contig. The end of the alignment is found with a
+    score-only pass (best_alignment_score()), its start with a second
+    score-only pass over the reversed prefixes of both sequences. Only the
+    region between these positions is then scored with score_alignment() and
+    traced back.
+
+    Parameters
+    ----------
+    query : str, QueryProfile
+        query sequence or its precomputed profile
+    contig : str
+        contig sequence
+    gap : int, optional
+        gap score, by default -5. Ignored if query is a QueryProfile
+    match : int, optional
+        matching score, by default 10. Ignored if query is a QueryProfile
+    mismatch : int, optional
+        mismatch score, by default -4. Ignored if query is a QueryProfile
+
+    Returns
+    -------
+    tuple
+        positions, scores in the same format as trace_back(). Positions are
+        given in the coordinates of the whole scoring matrix
+    """
+    if not isinstance(query, QueryProfile):
+        query = QueryProfile(query, gap, match, mismatch)
+    scores = (query.gap, query.match, query.mismatch)
+
+    score, contig_end, query_end = best_alignment_score(query, contig)
+    if score == 0:
+        return ([(0, 0)], [0.0])
+
+    # the best alignment of the reversed prefixes ends where the best
+    # alignment of the sequences starts
+    _, contig_span, query_span = best_alignment_score(
+        query.query[:query_end][::-1], contig[:contig_end][::-1], *scores
+    )
+    contig_beg = contig_end - contig_span
+    query_beg = query_end - query_span
+
+    # tracing back inside the region and shifting back to global positions
+    region_matrix, directions = score_alignment(
+        query.query[query_beg:query_end],
+        contig[contig_beg:contig_end],
+        *scores,
+        return_directions=True,
+    )
+    positions, region_scores = trace_back(region_matrix, directions)
+    positions = [(int(x + contig_beg), int(y + query_beg)) for x, y in positions]
+
+    return (positions, region_scores)
+
+
+def seed_diagonal(query: str, contig: str, k=11):
+    """Finds the diagonal (query position - contig position) shared by most
+    kmers of the query and the contig. Repeated query kmers are only seeded
+    from their first occurrence.
+
+    Parameters
+    ----------
+    query : str
+        query sequence
+    contig : str
+        contig sequence
+    k : int, optional
+        seed kmer size, by default 11
+
+    Returns
+    -------
+    int, NoneType
+        most supported diagonal, None if the sequences share no kmer
+    """
+    query_kmers, query_pos = sequence_kmers(query, k)
+    contig_kmers, contig_pos = sequence_kmers(contig, k)
+
+    if len(query_kmers) == 0 or len(contig_kmers) == 0:
+        return None
+
+    # first position of every distinct query kmer
+    unique_kmers, first_idx = np.unique(query_kmers, return_index=True)
+    hits = np.searchsorted(unique_kmers, contig_kmers)
+    hits[hits == len(unique_kmers)] = 0
+    shared = unique_kmers[hits] == contig_kmers
+    if not shared.any():
+        return None
+
+    diagonals = query_pos[first_idx[hits[shared]]] - contig_pos[shared]
+    values, counts = np.unique(diagonals, return_counts=True)
+    return int(values[counts.argmax()])
+
+
+def score_banded_alignment(
+    query: str,
+    contig: str,
+    diagonal: int,
+    band_width: int,
+    gap=-5,
+    match=10,
+    mismatch=-4,
+) -> tuple:
+    """Do a local alignment between x and y restricted to a band around a
+    diagonal. Only the cells (i, j) with |j - i - diagonal| <= band_width are
+    computed and stored: cell (i, j) is stored in band[i, j - i - diagonal +
+    band_width]. Cells of the band that fall outside of the scoring matrix
+    are set to -inf.
+
+    Inside the band, scores and directions are the ones of score_alignment()
+    restricted to paths that stay in the band.
+
+    Parameters
+    ----------
+    query : str
+        sequence placed along the columns
+    contig : str
+        sequence placed along the rows
+    diagonal : int
+        diagonal at the center of the band (query position - contig position)
+    band_width : int
+        number of diagonals computed on each side of the center diagonal
+    gap : int, optional
+        gap score, by default -5
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+
+    Returns
+    -------
+    tuple
+        (band, directions) (len(contig) + 1, 2 * band_width + 1) scores and
+        uint8 directions of the band
+    """
+    n_cols = 2 * band_width + 1
+    band = np.full((len(contig) + 1, n_cols), -np.inf)
+    directions = np.zeros(band.shape, dtype=np.uint8)
+    band_steps = np.arange(n_cols)
+    gap_steps = gap * band_steps.astype(np.float64)
+
+    # first row of the scoring matrix
+    cols = band_steps + diagonal - band_width
+    band[0, (cols >= 0) & (cols <= len(query))] = 0
+
+    (query_codes, contig_codes), n_symbols = encode_symbols(query, contig)
+    profile = substitution_profile(query_codes, n_symbols, match, mismatch)
+
+    up_scores = np.full(n_cols, -np.inf)
     for i in range(1, len(contig) + 1):
-        for j in range(1, len(query) + 1):
-
-            # getting best score per row
-            # -- we are maximizing the score
-            score_matrix[i][j] = max(
-                score_matrix[i][j - 1] + gap,
-                score_matrix[i - 1][j] + gap,
-                score_matrix[i - 1][j - 1]
-                + match_scoring(
-                    contig[i - 1],
-                    query[j - 1],
-                    match_score=match,
-                    mismatch_score=mismatch,
-                ),
-                0,
+        prev_row = band[i - 1]
+        row = band[i]
+        cols = band_steps + (i + diagonal - band_width)
+        in_matrix = (cols >= 0) & (cols <= len(query))
+        if not in_matrix.any():
+            continue
+        scored = in_matrix & (cols >= 1)
+
+        # (i - 1, j - 1) and (i - 1, j) are stored in the same and next band
+        # column of the previous row
+        diag_scores = np.full(n_cols, -np.inf)
+        subs_scores = profile[contig_codes[i - 1], cols[scored] - 1]
+        diag_scores[scored] = prev_row[scored] + subs_scores
+        up_scores[:-1] = prev_row[1:] + gap
+        np.maximum(diag_scores, up_scores, out=row)
+        np.maximum(row, 0, out=row)
+        row[~scored] = -np.inf
+        row[in_matrix & (cols == 0)] = 0
+
+        # horizontal gaps
+        row -= gap_steps
+        np.maximum.accumulate(row, out=row)
+        row += gap_steps
+        row[~in_matrix] = -np.inf
+
+        directions[i] = np.select(
+            [~scored | (row == 0), row == diag_scores, row == up_scores],
+            [STOP, DIAG, UP],
+            LEFT,
+        )
+
+    return (band, directions)
+
+
+def banded_alignment(
+    query: str,
+    contig: str,
+    band_width=16,
+    diagonal=None,
+    k=11,
+    gap=-5,
+    match=10,
+    mismatch=-4,
+) -> Alignment:
+    """Aligns a query against a contig by only computing a band of the
+    scoring matrix around a diagonal, which takes O(len(contig) * band_width)
+    instead of O(len(contig) * len(query)).
+
+    Parameters
+    ----------
+    query : str
+        query sequence
+    contig : str
+        contig sequence
+    band_width : int, optional
+        number of diagonals computed on each side of the center diagonal,
+        by default 16
+    diagonal : int, optional
+        diagonal at the center of the band (query position - contig
+        position). If None, the diagonal is seeded from the kmers shared by
+        both sequences (see seed_diagonal()). Diagonals outside of the
+        scoring matrix are moved to its closest corner, by default None
+    k : int, optional
+        seed kmer size, by default 11
+    gap : int, optional
+        gap score, by default -5
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+
+    Returns
+    -------
+    Alignment
+        best alignment found inside the band. If no diagonal is given and no
+        seed is found, the whole scoring matrix is used
+    """
+    if diagonal is None:
+        diagonal = seed_diagonal(query, contig, k)
+        if diagonal is None:
+            return trace_alignment(
+                *score_alignment(query, contig, gap, match, mismatch, return_directions=True)
             )
 
-    # convert into pandas dataframe
-    return score_matrix
+    # a band that misses the scoring matrix would not contain any cell
+    diagonal = min(max(int(diagonal), -len(contig)), len(query))
+    band, directions = score_banded_alignment(
+        query, contig, diagonal, band_width, gap, match, mismatch
+    )
+
+    # walking back in band coordinates: diagonal moves stay in the same band
+    # column, vertical moves go to the next one
+    x, col = (int(pos) for pos in np.unravel_index(band.argmax(), shape=band.shape))
+    offset = diagonal - band_width
+    end = (x, x + col + offset)
+    moves = []
+    move = directions[x, col]
+    while move != STOP:
+        if move == DIAG:
+            x -= 1
+        elif move == UP:
+            x -= 1
+            col += 1
+        else:
+            col -= 1
+        moves.append(int(move))
+        move = directions[x, col]
+
+    return Alignment(
+        contig_beg=x,
+        contig_end=end[0],
+        query_beg=x + col + offset,
+        query_end=end[1],
+        score=float(band.max()),
+        cigar=_moves_to_cigar(moves),
+    )
 
 
 def covert_alignment_to_pandas(
@@ -226,5 +1032,301 @@ def covert_alignment_to_pandas(
     return alignment_df
 
 
-def run_local_alignment(contig, query, match=10, mismatch=-4, gap=-5):
-    pass
+def iter_contigs(contigs):
+    """Yields the contigs of the different formats accepted by the alignment
+    functions
+
+    Parameters
+    ----------
+    contigs : dict, iterable
+        contigs as returned by run_de_bruijn() (scaffold -> contig label ->
+        sequence), a dictionary of contig id -> sequence or an iterable of
+        sequences
+
+    Yields
+    ------
+    tuple
+        (scaffold, contig_id, sequence). scaffold is None if the contigs are
+        not grouped by scaffold and contig_id is the position of the contig
+        if the contigs are not labeled
+    """
+    if not isinstance(contigs, dict):
+        for idx, seq in enumerate(contigs):
+            yield None, idx, seq
+        return
+
+    for key, value in contigs.items():
+        if isinstance(value, dict):
+            for contig_id, seq in value.items():
+                yield key, contig_id, seq
+        else:
+            yield None, key, value
+
+
+def run_local_alignment(
+    query: str,
+    contigs,
+    top_n=None,
+    match=10,
+    mismatch=-4,
+    gap=-5,
+    gap_open=None,
+    gap_extend=None,
+    threads=1,
+) -> pd.DataFrame:
+    """Aligns a query against a batch of contigs. The query profile is built
+    once and the scoring and direction matrices are allocated once, with the
+    size of the longest contig, and reused for every contig (once per worker
+    process when threads is not 1).
+
+    Parameters
+    ----------
+    query : str
+        query sequence
+    contigs : dict, iterable
+        contigs as returned by run_de_bruijn() (scaffold -> contig label ->
+        sequence), a dictionary of contig id -> sequence or an iterable of
+        sequences
+    top_n : int, optional
+        only keeps the top_n best alignments. If None, all alignments are
+        returned, by default None
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+    gap : int, optional
+        gap score, by default -5
+    gap_open : int, optional
+        gap open score. If gap_open and gap_extend are given, affine gaps are
+        used instead of gap (see score_affine_alignment()), by default None
+    gap_extend : int, optional
+        gap extend score, by default None
+    threads : int, optional
+        number of processes used to align the contigs (see
+        align_contigs_parallel()). If None, all available cores are used,
+        by default 1
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per alignment with the RESULT_COLUMNS columns, sorted by
+        score. Contigs with equal scores keep their input order
+
+    Raises
+    ------
+    ValueError
+        raised if the scores are not integers or if top_n is smaller than 1
+    """
+    if top_n is not None and top_n < 1:
+        raise ValueError(f"top_n must be at least 1, got {top_n}")
+
+    profile = QueryProfile(query, gap, match, mismatch)
+    contigs = list(iter_contigs(contigs))
+    if threads is None or (threads > 1 and len(contigs) > 1):
+        records = align_contigs_parallel(
+            profile, contigs, top_n, gap_open, gap_extend, threads
+        )
+    else:
+        records = align_contigs(profile, contigs, top_n, gap_open, gap_extend)
+    return pd.DataFrame(records, columns=RESULT_COLUMNS)
+
+
+def align_contigs(
+    profile: QueryProfile, contigs, top_n=None, gap_open=None, gap_extend=None
+) -> list:
+    """Aligns a query profile against a batch of contigs, see
+    run_local_alignment()
+
+    Parameters
+    ----------
+    profile : QueryProfile
+        query profile
+    contigs : iterable
+        (scaffold, contig_id, sequence) of each contig, see iter_contigs()
+    top_n : int, optional
+        only keeps the top_n best alignments, by default None
+    gap_open : int, optional
+        affine gap open score, by default None
+    gap_extend : int, optional
+        affine gap extend score, by default None
+
+    Returns
+    -------
+    list
+        result records (see RESULT_COLUMNS) sorted by score
+    """
+    items = [(order,) + contig for order, contig in enumerate(contigs)]
+    ranked = _align_items(profile, items, top_n, gap_open, gap_extend)
+    ranked.sort(reverse=True)
+    return [record for _, _, record in ranked]
+
+
+def align_contigs_parallel(
+    profile: QueryProfile,
+    contigs,
+    top_n=None,
+    gap_open=None,
+    gap_extend=None,
+    threads=None,
+    chunks_per_thread=4,
+) -> list:
+    """Aligns a query profile against a batch of contigs across a process
+    pool. The profile is sent once to every worker process (pool
+    initializer) and the contigs are split into chunks of similar total
+    length. Chunks are merged into the results as soon as they complete.
+
+    Parameters
+    ----------
+    profile : QueryProfile
+        query profile
+    contigs : iterable
+        (scaffold, contig_id, sequence) of each contig, see iter_contigs()
+    top_n : int, optional
+        only keeps the top_n best alignments, by default None
+    gap_open : int, optional
+        affine gap open score, by default None
+    gap_extend : int, optional
+        affine gap extend score, by default None
+    threads : int, optional
+        number of worker processes. If None, all available cores are used,
+        by default None
+    chunks_per_thread : int, optional
+        number of chunks created per worker process, by default 4
+
+    Returns
+    -------
+    list
+        result records (see RESULT_COLUMNS) sorted by score, identical to
+        the ones of align_contigs()
+    """
+    items = [(order,) + contig for order, contig in enumerate(contigs)]
+    if threads is None:
+        threads = os.cpu_count()
+    chunks = _balanced_chunks(items, threads * chunks_per_thread)
+
+    ranked = []
+    with ProcessPoolExecutor(
+        max_workers=threads, initializer=_init_alignment_worker, initargs=(profile,)
+    ) as executor:
+        futures = [
+            executor.submit(_align_chunk, chunk, top_n, gap_open, gap_extend)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            for item in future.result():
+                _push_ranked(ranked, item, top_n)
+
+    ranked.sort(reverse=True)
+    return [record for _, _, record in ranked]
+
+
+def _balanced_chunks(items: list, n_chunks: int) -> list:
+    """Splits (order, scaffold, contig_id, sequence) items into at most
+    n_chunks chunks of similar total sequence length. The longest contigs
+    are assigned first, each one to the chunk with the smallest total.
+    """
+    n_chunks = max(1, min(n_chunks, len(items)))
+    chunks = [[] for _ in range(n_chunks)]
+    totals = [(0, idx) for idx in range(n_chunks)]
+    for item in sorted(items, key=lambda item: -len(item[3])):
+        total, idx = heapq.heappop(totals)
+        chunks[idx].append(item)
+        heapq.heappush(totals, (total + len(item[3]), idx))
+
+    return [chunk for chunk in chunks if len(chunk) > 0]
+
+
+# query profile of the worker process, set once by _init_alignment_worker()
+_worker_profile = None
+
+
+def _init_alignment_worker(profile: QueryProfile):
+    """Stores the query profile in the worker process"""
+    global _worker_profile
+    _worker_profile = profile
+
+
+def _align_chunk(items, top_n, gap_open, gap_extend) -> list:
+    """Aligns a chunk of contigs with the query profile of the worker"""
+    return _align_items(_worker_profile, items, top_n, gap_open, gap_extend)
+
+
+def _align_items(profile, items, top_n, gap_open, gap_extend) -> list:
+    """Aligns (order, scaffold, contig_id, sequence) items and returns the
+    (score, -order, record) of the kept alignments
+    """
+    affine = gap_open is not None and gap_extend is not None
+    if affine and gap_extend < gap_open:
+        raise ValueError("gap_extend must be greater or equal to gap_open")
+    scores = profile.scores.astype(np.float64)
+
+    # buffers shared by all contigs: (H, E, F) with affine gaps, scores and
+    # directions otherwise
+    max_length = max([len(item[3]) for item in items], default=0)
+    shape = (max_length + 1, len(profile) + 1)
+    if affine:
+        buffers = (np.zeros(shape), np.full(shape, -np.inf), np.full(shape, -np.inf))
+    else:
+        buffers = (np.zeros(shape), np.zeros(shape, dtype=np.uint8))
+
+    ranked = []
+    for order, scaffold, contig_id, seq in items:
+        contig_codes = profile.encode_contig(seq)
+        matrices = [buffer[: len(seq) + 1] for buffer in buffers]
+        if affine:
+            h_matrix, e_matrix, f_matrix = matrices
+            h_matrix[1:] = 0
+            e_matrix[1:] = -np.inf
+            f_matrix[1:] = -np.inf
+            _fill_affine_alignment(
+                h_matrix, e_matrix, f_matrix, contig_codes, scores, gap_open, gap_extend
+            )
+            alignment = _affine_alignment(matrices, gap_open, gap_extend)
+        else:
+            score_matrix, directions = matrices
+            score_matrix[1:] = 0
+            directions[1:] = STOP
+            _fill_alignment(score_matrix, directions, contig_codes, scores, profile.gap)
+            alignment = trace_alignment(score_matrix, directions)
+
+        item = (alignment.score, -order, (scaffold, contig_id) + tuple(alignment))
+        _push_ranked(ranked, item, top_n)
+
+    return ranked
+
+
+def _push_ranked(ranked: list, item: tuple, top_n=None):
+    """Adds a (score, -order, record) item to a min heap that keeps the
+    top_n best items, the worst kept item is replaced first
+    """
+    if top_n is None or len(ranked) < top_n:
+        heapq.heappush(ranked, item)
+    elif item > ranked[0]:
+        heapq.heapreplace(ranked, item)
+
+
+def _affine_alignment(score_matrices, gap_open, gap_extend) -> Alignment:
+    """Summarizes the alignment traced back from filled affine scoring
+    matrices
+    """
+    positions, scores = affine_trace_back(score_matrices, gap_open, gap_extend)
+
+    # moves are recovered from the steps between traced back positions
+    moves = []
+    for (x, y), (prev_x, prev_y) in zip(positions[:-1], positions[1:]):
+        if x != prev_x and y != prev_y:
+            moves.append(DIAG)
+        elif x != prev_x:
+            moves.append(UP)
+        else:
+            moves.append(LEFT)
+
+    (contig_end, query_end), (contig_beg, query_beg) = positions[0], positions[-1]
+    return Alignment(
+        contig_beg=contig_beg,
+        contig_end=contig_end,
+        query_beg=query_beg,
+        query_end=query_end,
+        score=float(scores[0]),
+        cigar=_moves_to_cigar(moves),
+    )
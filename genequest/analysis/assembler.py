@@ -7,96 +7,589 @@
 # by using De bruijn graphs.
 # paper explaining development of de bruijn graphs: https://doi.org/10.1038/nbt.2023
 # ------------------------------
-from copy import deepcopy
-from collections import defaultdict
-from genequest.io_handler.parser import FastaReader
+import os
+from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from genequest.io_handler.parser import FastaReader, group_by_scaffold
+from genequest.io_handler.read_store import ReadStore
 from genequest.common.errors import KmerSizeError, NoNodesFoundError
-from genequest.io_handler.gene_io import save_contigs
+from genequest.io_handler.gene_io import open_contig_store, save_contigs
+from genequest.io_handler.cache import AssemblyCache
+from genequest.common.encoding import (
+    NUCLEOTIDES,
+    DECODING_TABLE,
+    kmer_to_int,
+    int_to_kmer,
+)
+from genequest.analysis.kmer_counter import count_transitions
 
+# version of the assembly algorithm, cached contigs assembled by other
+# versions are not reused
+ASSEMBLER_VERSION = "1.0"
 
-class Node:
-    """Class Node to represent a vertex in the de bruijn graph"""
+# reader settings that change the reads of a file (e.g. FASTQ trimming), they
+# are part of the cache key since they change the assembled contigs
+READER_PARAMS = ("min_quality", "window_size", "min_length", "phred_offset")
 
-    def __init__(self, label):
-        self.label = label
-        self.indegree = 0
-        self.outdegree = 0
 
+class DeBruijnGraph:
+    """Array backed de bruijn graph. Nodes are identified by integer ids that
+    index the sorted array of 2-bit encoded kmers. Edges are stored in
+    compressed sparse row (CSR) format: the outgoing edges of node i are
+    targets[indptr[i] : indptr[i + 1]], each unique transition is stored once
+    along with the number of times it occurs in the reads (multiplicity).
 
-class Edge:
-    def __init__(self, label):
-        self.label = label
+    parameters
+    ----------
+    kmers : np.ndarray
+        sorted uint64 kmers, one per node
+    indptr : np.ndarray
+        start position of the outgoing edges of each node
+    targets : np.ndarray
+        target node id of each edge
+    multiplicity : np.ndarray
+        number of occurrences of each edge
+    k : int
+        kmer size
+
+    methods
+    -------
+    from_reads(reads, k):method builds the graph from a batch of reads
+    start_nodes():method returns the nodes without incoming edges
+    successors(node):method returns the target nodes of a node
+    """
+
+    def __init__(self, kmers, indptr, targets, multiplicity, k):
+        self.kmers = kmers
+        self.indptr = indptr
+        self.targets = targets
+        self.multiplicity = multiplicity
+        self.k = k
+
+        # degrees take the multiplicity of the edges into account
+        sources = np.repeat(np.arange(len(kmers)), np.diff(indptr))
+        self.outdegree = np.bincount(
+            sources, weights=multiplicity, minlength=len(kmers)
+        ).astype(np.int64)
+        self.indegree = np.bincount(
+            targets, weights=multiplicity, minlength=len(kmers)
+        ).astype(np.int64)
+
+    @classmethod
+    def from_reads(cls, reads, k):
+        """Builds a de bruijn graph from a batch of reads. Transitions between
+        kmers are counted in bulk with the kmer counting engine (see
+        genequest.analysis.kmer_counter).
+
+        Parameters
+        ----------
+        reads : ReadStore, iterable
+            ReadStore or iterable of FastaEntry objects
+        k : int
+            kmer size
+
+        Returns
+        -------
+        DeBruijnGraph
+            graph containing all kmers of the reads
+        """
+        prefixes, suffixes, counts = count_transitions(reads, k)
+        kmers = np.union1d(prefixes, suffixes)
+
+        # transitions are sorted by prefix, so edges are already grouped
+        # by their source node
+        sources = np.searchsorted(kmers, prefixes)
+        targets = np.searchsorted(kmers, suffixes).astype(np.int32)
+        indptr = np.zeros(len(kmers) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(kmers)), out=indptr[1:])
+
+        return cls(kmers, indptr, targets, counts.astype(np.uint32), k)
+
+    @property
+    def n_nodes(self) -> int:
+        """Number of nodes in the graph"""
+        return len(self.kmers)
+
+    @property
+    def n_edges(self) -> int:
+        """Number of unique edges in the graph"""
+        return len(self.targets)
+
+    def label(self, node) -> str:
+        """Returns the kmer sequence of a node"""
+        return int_to_kmer(int(self.kmers[node]), self.k)
 
+    def node_id(self, kmer: str) -> int:
+        """Returns the node id of a kmer
 
-def create_bruijn_graph(reads, k=3) -> tuple:
-    """Generate a
+        Raises
+        ------
+        KeyError
+            raised if the kmer is not a node of the graph
+        """
+        value = np.uint64(kmer_to_int(kmer))
+        node = int(np.searchsorted(self.kmers, value))
+        if node == self.n_nodes or self.kmers[node] != value:
+            raise KeyError(kmer)
+        return node
+
+    def successors(self, node) -> np.ndarray:
+        """Returns the target node ids of the outgoing edges of a node"""
+        return self.targets[self.indptr[node] : self.indptr[node + 1]]
+
+    def start_nodes(self) -> np.ndarray:
+        """Returns the ids of the nodes without incoming edges"""
+        return np.flatnonzero(self.indegree == 0)
+
+    def next_step(self, node, consumed, cursor=None):
+        """Follows the first outgoing edge of a node that has not been fully
+        consumed yet
+
+        Parameters
+        ----------
+        node : int
+            current node id
+        consumed : Counter, np.ndarray
+            number of times each edge has been used, updated in place
+        cursor : np.ndarray, optional
+            position of the next edge to inspect for each node, updated in
+            place. If None, all edges of the node are inspected, by default None
+
+        Returns
+        -------
+        tuple, NoneType
+            (next_node, sequence added by the step) or None if the node has
+            no edges left
+        """
+        end = self.indptr[node + 1]
+        edge = self.indptr[node] if cursor is None else cursor[node]
+        while edge < end and consumed[edge] >= self.multiplicity[edge]:
+            edge += 1
+        if cursor is not None:
+            cursor[node] = edge
+        if edge == end:
+            return None
+
+        consumed[edge] += 1
+        target = self.targets[edge]
+        return target, NUCLEOTIDES[int(self.kmers[target]) & 3]
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used to store the graph"""
+        arrays = [self.kmers, self.indptr, self.targets, self.multiplicity]
+        arrays += [self.indegree, self.outdegree]
+        return sum([array.nbytes for array in arrays])
+
+    def __repr__(self):
+        return f"DeBruijnGraph(k={self.k}, nodes={self.n_nodes}, edges={self.n_edges})"
+
+
+def create_bruijn_graph(reads, k=3) -> DeBruijnGraph:
+    """Generates a de bruijn graph from a batch of reads
 
     Parameters
     ----------
-    reads : _type_
-        _description_
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects
     k : int, optional
         sequence fragment length, by default 3
+
+    Returns
+    -------
+    DeBruijnGraph
+        array backed de bruijn graph
     """
+    return DeBruijnGraph.from_reads(reads, k)
 
-    edges = dict()
-    nodes = dict()
-    for read in reads:
-        for i in range(len(read.seq) - k + 1):
-            edge1 = read.seq[i : i + k]
-            edge2 = read.seq[i + 1 : i + k + 1]
-            if edge1 in edges.keys():
-                nodes[edge1].outdegree += 1
-                edges[edge1] += [Edge(edge2)]
-            else:
-                nodes[edge1] = Node(edge1)
-                nodes[edge1].outdegree += 1
-                edges[edge1] = [Edge(edge2)]
 
-            if edge2 in edges.keys():
-                nodes[edge2].indegree += 1
-            else:
-                nodes[edge2] = Node(edge2)
-                nodes[edge2].indegree += 1
-                edges[edge2] = []
-            i += 1
+class UnitigGraph:
+    """De bruijn graph where maximal non-branching paths (unitigs) are
+    collapsed. A unitig is a path of nodes in which every node, except the
+    last one (tail), has a single outgoing edge that is the only incoming
+    edge of the next node. All the internal edges of a unitig have the same
+    multiplicity, so they are always consumed together and walks only need
+    to visit the first (head) and the last (tail) node of each unitig.
+
+    parameters
+    ----------
+    graph : DeBruijnGraph
+        de bruijn graph that was compacted
+    heads : np.ndarray
+        first node id of each unitig
+    tails : np.ndarray
+        last node id of each unitig
+    first_edges : np.ndarray
+        first internal edge of each unitig, -1 for single node unitigs
+    sequences : list
+        sequence added when walking from the head to the tail of each unitig
+    node_unitig : np.ndarray
+        unitig index of each node
+
+    methods
+    -------
+    start_nodes():method returns the nodes without incoming edges
+    next_step(node, consumed, cursor):method walks to the next node
+    """
+
+    def __init__(self, graph, heads, tails, first_edges, sequences, node_unitig):
+        self.graph = graph
+        self.heads = heads
+        self.tails = tails
+        self.first_edges = first_edges
+        self.sequences = sequences
+        self.node_unitig = node_unitig
+
+    @property
+    def n_unitigs(self) -> int:
+        """Number of unitigs in the graph"""
+        return len(self.heads)
+
+    def label(self, node) -> str:
+        """Returns the kmer sequence of a node"""
+        return self.graph.label(node)
+
+    def start_nodes(self) -> np.ndarray:
+        """Returns the ids of the nodes without incoming edges"""
+        return self.graph.start_nodes()
+
+    def next_step(self, node, consumed, cursor=None):
+        """Walks from the head to the tail of a unitig if node is a unitig
+        head, otherwise follows the first outgoing edge of the node that has
+        not been fully consumed yet (see DeBruijnGraph.next_step).
+
+        The usage of the internal edges of a unitig is only recorded on its
+        first internal edge.
+
+        Returns
+        -------
+        tuple, NoneType
+            (next_node, sequence added by the step) or None if the node has
+            no edges left
+        """
+        unitig = self.node_unitig[node]
+        first_edge = self.first_edges[unitig]
+        if node == self.heads[unitig] and first_edge >= 0:
+            if consumed[first_edge] >= self.graph.multiplicity[first_edge]:
+                return None
+            consumed[first_edge] += 1
+            return self.tails[unitig], self.sequences[unitig]
+
+        return self.graph.next_step(node, consumed, cursor)
+
+    def __repr__(self):
+        return f"UnitigGraph(nodes={self.graph.n_nodes}, unitigs={self.n_unitigs})"
+
+
+def compact_unitigs(graph: DeBruijnGraph) -> UnitigGraph:
+    """Collapses the maximal non-branching paths of a de bruijn graph into
+    unitigs. Independent walks (generate_contig) on the compacted graph
+    produce the same contigs as walks on the original graph. Eulerian trails
+    use every unitig as a whole, so repeated unitigs are no longer split into
+    one fragment per node.
+
+    Parameters
+    ----------
+    graph : DeBruijnGraph
+        de bruijn graph
+
+    Returns
+    -------
+    UnitigGraph
+        compacted graph
+    """
+    n_nodes = graph.n_nodes
+    n_out = np.diff(graph.indptr)
+    n_in = np.bincount(graph.targets, minlength=n_nodes)
+    sources = np.repeat(np.arange(n_nodes), n_out)
+
+    # an edge can be collapsed if it is the only edge leaving its source and
+    # the only edge entering its target
+    linkable = (n_out[sources] == 1) & (n_in[graph.targets] == 1)
+    linkable &= sources != graph.targets
+    chain_next = np.full(n_nodes, -1, dtype=np.int64)
+    chain_next[sources[linkable]] = graph.targets[linkable]
+    has_link_in = np.zeros(n_nodes, dtype=bool)
+    has_link_in[graph.targets[linkable]] = True
+
+    chain_next = chain_next.tolist()
+    indptr = graph.indptr.tolist()
+    multiplicity = graph.multiplicity.tolist()
+    visited = [False] * n_nodes
+
+    # nodes without a collapsible incoming edge start a unitig. Unitigs are
+    # also split when the multiplicity of the internal edges changes.
+    queue = np.flatnonzero(~has_link_in).tolist()
+    unitig_nodes = []
+    unitig_ptr = [0]
+    heads = []
+    tails = []
+    first_edges = []
+    idx = 0
+    scan = 0
+    while True:
+        if idx == len(queue):
+            # remaining nodes belong to cycles without any entry point, the
+            # scan position only moves forward since nodes stay visited
+            while scan < n_nodes and visited[scan]:
+                scan += 1
+            if scan == n_nodes:
+                break
+            queue.append(scan)
+
+        head = queue[idx]
+        idx += 1
+        visited[head] = True
+        unitig_nodes.append(head)
+        current = head
+        first_edge = -1
+        while True:
+            node = chain_next[current]
+            if node < 0 or visited[node]:
+                break
+
+            edge = indptr[current]
+            if first_edge < 0:
+                first_edge = edge
+            elif multiplicity[edge] != multiplicity[first_edge]:
+                queue.append(node)
+                break
+
+            visited[node] = True
+            unitig_nodes.append(node)
+            current = node
+
+        heads.append(head)
+        tails.append(current)
+        first_edges.append(first_edge)
+        unitig_ptr.append(len(unitig_nodes))
 
-    return (nodes, edges)
+    # every node after the head adds the last nucleotide of its kmer
+    unitig_nodes = np.array(unitig_nodes, dtype=np.int64)
+    last_nucs = DECODING_TABLE[(graph.kmers[unitig_nodes] & np.uint64(3)).astype(np.uint8)]
+    sequences = [
+        last_nucs[beg + 1 : end].tobytes().decode()
+        for beg, end in zip(unitig_ptr[:-1], unitig_ptr[1:])
+    ]
 
+    node_unitig = np.zeros(n_nodes, dtype=np.int64)
+    node_unitig[unitig_nodes] = np.repeat(np.arange(len(heads)), np.diff(unitig_ptr))
 
-def generate_contig(starting_edge, edges):
+    return UnitigGraph(
+        graph,
+        heads=np.array(heads, dtype=np.int64),
+        tails=np.array(tails, dtype=np.int64),
+        first_edges=np.array(first_edges, dtype=np.int64),
+        sequences=sequences,
+        node_unitig=node_unitig,
+    )
+
+
+def generate_contig(graph, start_node: int, consumed=None) -> str:
+    """Assembles a contig through a walk that starts at start_node. At every
+    node, the first outgoing edge that has not been fully consumed yet is
+    followed.
+
+    Parameters
+    ----------
+    graph : DeBruijnGraph, UnitigGraph
+        de bruijn graph or its compacted version
+    start_node : int
+        node id where the walk starts
+    consumed : Counter, np.ndarray, optional
+        number of times each edge has been used. Only the edges visited by the
+        walk are updated, so a new Counter can be used for every walk without
+        copying the graph. If None, a new Counter is used, by default None
+
+    Returns
+    -------
+    str
+        assembled contig
     """
-    Assembles genomes through eulerian walks
+    if consumed is None:
+        consumed = Counter()
+
+    # sequences are collected and joined once the walk is over
+    contig = [graph.label(start_node)]
+    step = graph.next_step(start_node, consumed)
+    while step is not None:
+        node, seq = step
+        contig.append(seq)
+        step = graph.next_step(node, consumed)
+
+    return "".join(contig)
+
+
+def generate_eulerian_contigs(
+    graph, start_node: int, consumed: np.ndarray, cursor: np.ndarray
+) -> list:
+    """Assembles contigs through eulerian trails (Hierholzer's algorithm) that
+    start at start_node. Cycles found along a trail are spliced into its
+    contig. Branches that end in a different dead end than the main trail
+    are returned as separate contigs that start at their branching node.
+
+    consumed and cursor are meant to be shared between all the walks of a
+    graph: each edge occurrence is only used by one contig and every edge is
+    only inspected a constant number of times, which makes assembling all
+    contigs linear in the size of the graph.
+
+    Parameters
+    ----------
+    graph : DeBruijnGraph, UnitigGraph
+        de bruijn graph or its compacted version
+    start_node : int
+        node id where the trail starts
+    consumed : np.ndarray
+        number of times each edge has been used, updated in place
+    cursor : np.ndarray
+        position of the next edge to inspect for each node, initialized as
+        indptr[:-1] of the de bruijn graph and updated in place
+
+    Returns
+    -------
+    list
+        assembled contigs, the first one starts at start_node
+    """
+    # stack and trail contain (node, sequence added when reaching the node)
+    stack = [(start_node, "")]
+    trail = []
+    branches = []
+    branch_node = None
+    while stack:
+        node = stack[-1][0]
+        step = graph.next_step(node, consumed, cursor)
+        if step is not None:
+            stack.append(step)
+            continue
+
+        # nodes are popped in reverse order. A popped node must be the one
+        # that pushed the previously popped node, otherwise the trail
+        # collected so far ended in another dead end and becomes a branch
+        popped = stack.pop()
+        if len(trail) > 0 and node != branch_node:
+            branches.append(_trail_to_contig(graph, branch_node, trail))
+            trail = []
+        trail.append(popped)
+        if len(stack) > 0:
+            branch_node = stack[-1][0]
+
+    # the first element of the trail is the start node itself
+    main_contig = _trail_to_contig(graph, start_node, trail[:-1])
+    return [main_contig] + branches
+
+
+def _trail_to_contig(graph, first_node: int, trail: list) -> str:
+    """Converts a reversed trail of (node, sequence) steps that follows
+    first_node into a sequence
+    """
+    contig = [graph.label(first_node)]
+    contig += [seq for _, seq in reversed(trail)]
+    return "".join(contig)
+
+
+def assemble_scaffold(reads, k: int, eulerian=False) -> defaultdict:
+    """Assembles the contigs of a single scaffold
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects of the scaffold
+    k : int
+        DNA fragment size
+    eulerian : bool, optional
+        assembles contigs through eulerian trails, see run_de_bruijn().
+        Default = False
+
+    Returns
+    -------
+    defaultdict
+        contig labels and contigs as key value pairs
+
+    Raises
+    ------
+    NoNodesFoundError
+        raised when no starting nodes are found for assembly
     """
-    # identifying all possible start nodes that have
-    # Conducting eulerian walks
-    contig = starting_edge
-    current = starting_edge
-    while len(edges[current]) > 0:
-        next = edges[current][0]
-        del edges[current][0]
-        contig += next.label[-1]
-        current = next.label
+    # generating graph using all reads of the scaffold
+    graph = create_bruijn_graph(reads, k)
 
-    return contig
+    # collapsing non-branching paths before traversal
+    unitigs = compact_unitigs(graph)
 
+    # finding starting nodes
+    starting_nodes = unitigs.start_nodes()
+    if len(starting_nodes) == 0:
+        raise NoNodesFoundError("No starting nodes were found, try increasing k size")
+
+    # assembly
+    # -- independent walks only track the edges they have visited
+    # -- eulerian trails share the edge usage across all walks
+    if eulerian is True:
+        consumed = np.zeros(graph.n_edges, dtype=np.int64)
+        cursor = graph.indptr[:-1].copy()
+
+    contigs = []
+    for starting_node in starting_nodes:
+        if eulerian is True:
+            contigs += generate_eulerian_contigs(unitigs, starting_node, consumed, cursor)
+        else:
+            contigs.append(generate_contig(unitigs, starting_node))
+
+    labeled_contigs = defaultdict(None)
+    for idx, contig in enumerate(contigs):
+        labeled_contigs[f"conting{idx+1}"] = contig
+
+    return labeled_contigs
+
+
+def _compact_reads(reads) -> ReadStore:
+    """Converts the reads of a scaffold into a ReadStore with contiguous
+    buffers, which is the form sent to worker processes
+    """
+    if isinstance(reads, ReadStore):
+        return reads.compact()
+    return ReadStore.from_entries(reads)
 
-def run_de_bruijn(sequences: FastaReader, k: str, save=False) -> defaultdict:
+
+def run_de_bruijn(
+    sequences: FastaReader, k: str, save=False, eulerian=False, workers=1, cache=None
+) -> defaultdict:
     """Builds a de brujin graph to solve assemble the sequence
     from reads.
 
     Parameters
     ----------
-    sequences : str
-        DNA sequence
+    sequences : FastaReader, ReadStore, iterable
+        FastaReader or ReadStore object, or any iterable of FastaEntry objects
+        such as the generator returned by FastaReader.stream()
     k : int
         DNA fragment size
     save : bool, optional
-        saves contigs data into a pickle file. Default = False. If set to true
-        a contigs_data/ directory will be created contining all the pickle files.
-        To open the files, import the genequest.io_handler.gene_io and import the
-        load_contigs() function load in the contigs data. This is to prevent re-
-        running the assembly algorithm
+        saves contigs data into a contig store. Default = False. If set to true
+        a contig_data/ directory will be created containing the contig stores.
+        Scaffolds are written as soon as they are assembled. To open the files,
+        import the genequest.io_handler.gene_io and import the load_contigs()
+        function load in the contigs data. This is to prevent re-running the
+        assembly algorithm
+    eulerian : bool, optional
+        If False, every contig is an independent walk from its starting node
+        and contigs can share edges. If True, contigs are eulerian trails that
+        share the edge usage of the graph, so every edge occurrence is used by
+        a single contig. Branching trails are returned as additional contigs.
+        Default = False
+    workers : int, NoneType, optional
+        number of processes used to assemble scaffolds in parallel. Reads are
+        sent to the workers as compact ReadStore objects and the contigs are
+        returned in scaffold order. If None, all available cores are used.
+        Default = 1
+    cache : AssemblyCache, str, NoneType, optional
+        assembly cache or path to the cache directory. Scaffolds are cached
+        by the content of their reads, k, eulerian and the assembler version,
+        so only scaffolds that changed since a previous run are assembled.
+        When sequences is a FastaReader, an unchanged reads file read with
+        the same reader settings (e.g. FASTQ trimming) is loaded from the
+        cache without grouping or hashing the reads. Default = None
 
     Raises
     ------
@@ -104,46 +597,101 @@ def run_de_bruijn(sequences: FastaReader, k: str, save=False) -> defaultdict:
         Raised if the kmer size is larger than the length of the shortest sequence read
 
     NoNodesFoundError
-        raised when no starting nodes are found for assembly
+        raised when no reads are provided or no starting nodes are found for
+        assembly
     """
 
+    # a reads file that was already assembled is loaded without being parsed
+    file_key = None
+    if isinstance(cache, str):
+        cache = AssemblyCache(cache)
+    if cache is not None:
+        reader_params = {name: getattr(sequences, name, None) for name in READER_PARAMS}
+        params_key = cache.params_key(
+            k=k, eulerian=eulerian, version=ASSEMBLER_VERSION, **reader_params
+        )
+        if isinstance(getattr(sequences, "filename", None), str):
+            file_key = cache.resolve_file(sequences.filename)
+            cached_scaffolds = cache.load_manifest(file_key, params_key)
+            if cached_scaffolds is not None:
+                generated_contigs = defaultdict(None, cached_scaffolds)
+                if save is True:
+                    save_contigs(generated_contigs)
+                return generated_contigs
+
+    # group sequences by scaffold
+    # -- streamed entries are grouped as they are read in
+    if hasattr(sequences, "group_by_scaffold"):
+        grouped_sequences = sequences.group_by_scaffold()
+    else:
+        grouped_sequences = group_by_scaffold(sequences)
+
+    if len(grouped_sequences) == 0:
+        raise NoNodesFoundError("no reads were provided for assembly")
+
     # kmer length checking (cannot be larger than the smallest reads)
-    min_length = min([seq.end_pos for seq in sequences])
+    min_length = min(
+        [seq.end_pos for reads in grouped_sequences.values() for seq in reads]
+    )
     if not k < min_length:
         raise KmerSizeError(
             f"k size is larger than the smallest read must be smaller than {min_length}"
         )
 
-    # group sequences by scaffold
-    grouped_sequences = sequences.group_by_scaffold()
-
-    generated_contigs = defaultdict(None)
-    for scaffold, reads in grouped_sequences.items():
+    if workers is None:
+        workers = os.cpu_count()
 
-        # generating graph only using 10000 reads per scaffold
-        nodes, edges = create_bruijn_graph(reads[:10000], k)
+    # only scaffolds missing from the cache are assembled
+    scaffold_keys = {}
+    cached_contigs = {}
+    if cache is not None:
+        for scaffold, reads in grouped_sequences.items():
+            scaffold_keys[scaffold] = cache.scaffold_key(reads, params_key)
+            contigs = cache.load_scaffold(scaffold_keys[scaffold])
+            if contigs is not None:
+                cached_contigs[scaffold] = contigs
+    pending = [scaffold for scaffold in grouped_sequences if scaffold not in cached_contigs]
 
-        # finding starting nodes
-        starting_edges = []
-        for kmer in nodes.keys():
-            if nodes[kmer].indegree == 0:
-                starting_edges.append(kmer)
-
-        if len(starting_edges) == 0:
-            raise NoNodesFoundError(
-                "No starting nodes were found, try increasing k size"
-            )
+    executor = None
+    writer = open_contig_store() if save is True else None
+    generated_contigs = defaultdict(None)
+    try:
+        if workers > 1 and len(pending) > 1:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+            futures = {
+                scaffold: executor.submit(
+                    assemble_scaffold,
+                    _compact_reads(grouped_sequences[scaffold]),
+                    k,
+                    eulerian,
+                )
+                for scaffold in pending
+            }
 
-        # assembly
-        labeled_contigs = defaultdict(None)
-        for idx, starting_edge in enumerate(starting_edges):
-            d_edges = deepcopy(edges)
-            contig = generate_contig(starting_edge, d_edges)
-            labeled_contigs[f"conting{idx+1}"] = contig
+        # results are collected in scaffold order so the output does not
+        # depend on which worker finishes first
+        for scaffold, reads in grouped_sequences.items():
+            if scaffold in cached_contigs:
+                contigs = cached_contigs[scaffold]
+            elif executor is not None:
+                contigs = futures[scaffold].result()
+            else:
+                contigs = assemble_scaffold(reads, k, eulerian)
 
-        generated_contigs[scaffold] = labeled_contigs
+            if cache is not None and scaffold not in cached_contigs:
+                cache.save_scaffold(scaffold_keys[scaffold], scaffold, contigs)
+            if writer is not None:
+                writer.add_scaffold(scaffold, contigs)
+            generated_contigs[scaffold] = contigs
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if writer is not None:
+            writer.close()
 
-    if save is True:
-        save_contigs(generated_contigs)
+    if file_key is not None:
+        cache.save_manifest(file_key, params_key, list(scaffold_keys.items()))
+    if cache is not None:
+        cache.evict()
 
     return generated_contigs
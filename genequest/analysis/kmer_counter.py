@@ -0,0 +1,197 @@
+# ------------------------------
+# kmer_counter.py
+#
+# Module containing vectorized functions for extracting and counting
+# kmers from a batch of reads. Kmers are represented as 2-bit encoded
+# integers (see genequest.common.encoding).
+# ------------------------------
+import numpy as np
+
+# genequest imports
+from genequest.common.encoding import (
+    ENCODING_TABLE,
+    AMBIGUOUS_CODE,
+    MAX_KMER_SIZE,
+    encode_seq,
+)
+from genequest.common.errors import KmerSizeError
+from genequest.io_handler.read_store import ReadStore
+from genequest.common.utils import lengths_to_offsets
+
+
+def encode_reads(reads) -> tuple:
+    """Encodes a batch of reads into a single contiguous array of nucleotide
+    codes.
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects
+
+    Returns
+    -------
+    tuple
+        (codes, offsets, lengths) where codes is a uint8 array containing all
+        reads and offsets/lengths describe the position of each read
+    """
+    if isinstance(reads, ReadStore):
+        lengths = reads.lengths
+        offsets = lengths_to_offsets(lengths)
+
+        # gathering the selected reads from the shared sequence buffer
+        positions = np.arange(lengths.sum(), dtype=np.int64)
+        positions += np.repeat(reads.offsets - offsets, lengths)
+        codes = ENCODING_TABLE[reads.seq_data[positions]]
+        return codes, offsets, lengths
+
+    seqs = [read.seq for read in reads]
+    lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+    raw_seqs = np.frombuffer("".join(seqs).encode(), dtype=np.uint8)
+    return ENCODING_TABLE[raw_seqs], lengths_to_offsets(lengths), lengths
+
+
+def window_kmers(codes: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, k: int):
+    """Computes the integer representation of every kmer window of an encoded
+    batch of reads. Windows crossing two reads or containing ambiguous
+    nucleotides are discarded.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        uint8 array of nucleotide codes
+    offsets : np.ndarray
+        start position of each read in codes
+    lengths : np.ndarray
+        length of each read
+    k : int
+        kmer size
+
+    Returns
+    -------
+    tuple
+        (kmers, positions) uint64 kmers and their start position in codes
+
+    Raises
+    ------
+    KmerSizeError
+        raised if k is larger than MAX_KMER_SIZE
+    """
+    if k > MAX_KMER_SIZE:
+        raise KmerSizeError(f"k must be smaller or equal to {MAX_KMER_SIZE}")
+
+    n_windows = len(codes) - k + 1
+    if n_windows <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+
+    # shifting in one nucleotide of every window at a time
+    kmers = np.zeros(n_windows, dtype=np.uint64)
+    for j in range(k):
+        kmers <<= np.uint64(2)
+        kmers |= (codes[j : j + n_windows] & 3).astype(np.uint64)
+
+    # windows must start and end within the same read
+    has_kmers = lengths >= k
+    starts = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.add.at(starts, offsets[has_kmers], 1)
+    np.add.at(starts, offsets[has_kmers] + lengths[has_kmers] - k + 1, -1)
+    valid = np.cumsum(starts[:n_windows]) > 0
+
+    # windows must not contain ambiguous nucleotides
+    n_ambiguous = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(codes == AMBIGUOUS_CODE, out=n_ambiguous[1:])
+    valid &= (n_ambiguous[k:] - n_ambiguous[:n_windows]) == 0
+
+    positions = np.flatnonzero(valid)
+    return kmers[positions], positions
+
+
+def sequence_kmers(seq: str, k: int) -> tuple:
+    """Returns the integer kmers of a single sequence and their positions.
+    Kmers containing ambiguous nucleotides are skipped.
+
+    Parameters
+    ----------
+    seq : str
+        DNA sequence
+    k : int
+        kmer size
+
+    Returns
+    -------
+    tuple
+        (kmers, positions) uint64 kmers and their position in the sequence
+    """
+    codes = encode_seq(seq)
+    offsets = np.zeros(1, dtype=np.int64)
+    lengths = np.array([len(codes)], dtype=np.int64)
+    return window_kmers(codes, offsets, lengths, k)
+
+
+def extract_kmers(reads, k: int) -> np.ndarray:
+    """Extracts all kmers found in a batch of reads
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects
+    k : int
+        kmer size
+
+    Returns
+    -------
+    np.ndarray
+        uint64 array of kmers in the order they appear in the reads
+    """
+    codes, offsets, lengths = encode_reads(reads)
+    kmers, _ = window_kmers(codes, offsets, lengths, k)
+    return kmers
+
+
+def count_kmers(reads, k: int) -> tuple:
+    """Counts the occurrences of each kmer in a batch of reads
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects
+    k : int
+        kmer size
+
+    Returns
+    -------
+    tuple
+        (kmers, counts) sorted unique kmers and their number of occurrences
+    """
+    return np.unique(extract_kmers(reads, k), return_counts=True)
+
+
+def count_transitions(reads, k: int) -> tuple:
+    """Counts the transitions between overlapping kmers in a batch of reads.
+    A transition is a (k+1)-mer, its prefix and suffix kmers are the nodes of
+    a de bruijn graph edge.
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects
+    k : int
+        kmer size
+
+    Returns
+    -------
+    tuple
+        (prefixes, suffixes, counts) kmers of each unique transition and its
+        multiplicity. Transitions are sorted by prefix and suffix.
+
+    Raises
+    ------
+    KmerSizeError
+        raised if k + 1 is larger than MAX_KMER_SIZE
+    """
+    if k + 1 > MAX_KMER_SIZE:
+        raise KmerSizeError(f"k must be smaller than {MAX_KMER_SIZE}")
+
+    transitions, counts = count_kmers(reads, k + 1)
+    prefixes = transitions >> np.uint64(2)
+    suffixes = transitions & np.uint64((1 << (2 * k)) - 1)
+    return prefixes, suffixes, counts
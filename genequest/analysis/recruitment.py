@@ -0,0 +1,195 @@
+# ------------------------------
+# recruitment.py
+#
+# Module containing functions for recruiting the reads that are related to
+# a query gene before assembly. Reads are compared to the query through
+# their (w, k)-minimizers: the smallest (hashed) kmer of every window of w
+# consecutive kmers.
+# ------------------------------
+from collections.abc import Iterator
+import numpy as np
+
+# genequest imports
+from genequest.io_handler.parser import FastaEntry, FastaReader, iter_fasta
+from genequest.io_handler.read_store import ReadStore
+from genequest.analysis.kmer_counter import encode_reads, window_kmers
+
+# number of reads whose minimizers are computed at once
+BATCH_SIZE = 100000
+
+
+def hash_kmers(kmers: np.ndarray) -> np.ndarray:
+    """Scrambles integer kmers with an invertible 64 bit mix (splitmix64
+    finalizer), so minimizers are not biased towards kmers such as AAA...A
+    that have the smallest 2-bit values
+
+    Parameters
+    ----------
+    kmers : np.ndarray
+        uint64 kmers
+
+    Returns
+    -------
+    np.ndarray
+        uint64 hash of each kmer
+    """
+    hashes = kmers ^ (kmers >> np.uint64(30))
+    hashes *= np.uint64(0xBF58476D1CE4E5B9)
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= np.uint64(0x94D049BB133111EB)
+    hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+
+def batch_minimizers(reads, k: int, w: int) -> tuple:
+    """Computes the (w, k)-minimizers of a batch of reads. Windows are only
+    formed by consecutive kmers of the same read, reads shorter than
+    k + w - 1 nucleotides have no minimizers.
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore or iterable of FastaEntry objects
+    k : int
+        kmer size
+    w : int
+        number of consecutive kmers per window
+
+    Returns
+    -------
+    tuple
+        (minimizers, read_idx) uint64 minimizer kmers and the index of the
+        read they come from. Each minimizer position is only reported once
+    """
+    codes, offsets, lengths = encode_reads(reads)
+    kmers, positions = window_kmers(codes, offsets, lengths, k)
+    n_windows = len(kmers) - w + 1
+    if n_windows <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+
+    # a window is valid if its kmers are consecutive kmers of a single read
+    read_idx = np.searchsorted(offsets, positions, side="right") - 1
+    valid = read_idx[w - 1 :] == read_idx[:n_windows]
+    valid &= (positions[w - 1 :] - positions[:n_windows]) == w - 1
+    window_starts = np.flatnonzero(valid)
+
+    # position of the smallest hash of every window, computed with w shifted
+    # comparisons so no (n_windows, w) array is created. Strict comparisons
+    # keep the leftmost position on ties, like argmin.
+    hashes = hash_kmers(kmers)
+    min_hashes = hashes[:n_windows].copy()
+    min_positions = np.arange(n_windows, dtype=np.int64)
+    for shift in range(1, w):
+        shifted = hashes[shift : shift + n_windows]
+        smaller = shifted < min_hashes
+        min_hashes[smaller] = shifted[smaller]
+        min_positions[smaller] = np.flatnonzero(smaller) + shift
+
+    selected = np.unique(min_positions[window_starts])
+    return kmers[selected], read_idx[selected]
+
+
+def sequence_minimizers(seq: str, k: int, w: int) -> np.ndarray:
+    """Returns the distinct (w, k)-minimizers of a single sequence"""
+    minimizers, _ = batch_minimizers([FastaEntry("", "", seq)], k, w)
+    return np.unique(minimizers)
+
+
+def recruit_reads(
+    query, reads, k=15, w=10, rounds=0, keep_scaffolds=False, batch_size=BATCH_SIZE
+):
+    """Keeps the reads that share at least one minimizer with the query.
+    Reads are streamed in batches, so the whole read set is never held in
+    memory, only the recruited reads are.
+
+    Extension rounds add the minimizers of the recruited reads to the query
+    minimizers and scan the reads again, which recruits reads that overlap
+    the recruited reads but not the query itself (e.g. flanking regions).
+
+    Parameters
+    ----------
+    query : str
+        query sequence
+    reads : str, FastaReader, ReadStore, iterable
+        path to a FASTA file, FastaReader or ReadStore object, or any iterable
+        of FastaEntry objects
+    k : int, optional
+        kmer size, by default 15
+    w : int, optional
+        number of consecutive kmers per window, by default 10
+    rounds : int, optional
+        number of extension rounds, by default 0
+    keep_scaffolds : bool, optional
+        If True, all the reads of the scaffolds that contain a recruited read
+        are returned. Default = False
+    batch_size : int, optional
+        number of reads processed at once, by default BATCH_SIZE
+
+    Returns
+    -------
+    ReadStore
+        recruited reads, in the order they appear in the input
+
+    Raises
+    ------
+    ValueError
+        raised if extension rounds or scaffold recruitment are requested on
+        reads that can only be iterated once (e.g. generators)
+    """
+    single_pass = isinstance(reads, Iterator) and not isinstance(reads, FastaReader)
+    if single_pass and (rounds > 0 or keep_scaffolds):
+        e_msg = "extension rounds and scaffold recruitment require re-iterable reads"
+        raise ValueError(e_msg)
+
+    target_minimizers = sequence_minimizers(query, k, w)
+    recruited = {}
+    for _ in range(rounds + 1):
+        new_reads = {}
+        for read_offset, batch in _iter_batches(reads, batch_size):
+            minimizers, read_idx = batch_minimizers(batch, k, w)
+            hits = np.unique(read_idx[np.isin(minimizers, target_minimizers)])
+            for idx in hits.tolist():
+                if read_offset + idx not in recruited:
+                    new_reads[read_offset + idx] = batch[idx]
+
+        # the next round searches for the minimizers of the new reads
+        recruited.update(new_reads)
+        if len(new_reads) == 0:
+            break
+        new_minimizers, _ = batch_minimizers(list(new_reads.values()), k, w)
+        target_minimizers = np.union1d(target_minimizers, new_minimizers)
+
+    # last scan collecting the remaining reads of the recruited scaffolds
+    if keep_scaffolds is True:
+        scaffolds = {entry.scaffold_id for entry in recruited.values()}
+        for read_offset, batch in _iter_batches(reads, batch_size):
+            for idx, entry in enumerate(batch):
+                if entry.scaffold_id in scaffolds:
+                    recruited[read_offset + idx] = entry
+
+    return ReadStore.from_entries([recruited[idx] for idx in sorted(recruited)])
+
+
+def _iter_batches(reads, batch_size):
+    """Yields (index of the first read, batch) where batch is a list of
+    FastaEntry objects or a ReadStore view
+    """
+    if isinstance(reads, ReadStore):
+        for beg in range(0, len(reads), batch_size):
+            yield beg, reads[beg : beg + batch_size]
+        return
+
+    if isinstance(reads, str):
+        reads = iter_fasta(reads)
+
+    batch = []
+    read_offset = 0
+    for entry in reads:
+        batch.append(entry)
+        if len(batch) == batch_size:
+            yield read_offset, batch
+            read_offset += len(batch)
+            batch = []
+
+    if len(batch) > 0:
+        yield read_offset, batch
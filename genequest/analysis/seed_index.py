@@ -0,0 +1,271 @@
+# ------------------------------
+# seed_index.py
+#
+# Module containing a kmer seed index over assembled contigs. The index is
+# used to find the contigs that share seeds with a query on a consistent
+# diagonal, so only these contigs are sent to local alignment.
+# ------------------------------
+from collections import defaultdict
+import numpy as np
+
+# genequest imports
+from genequest.analysis.kmer_counter import sequence_kmers
+from genequest.analysis.alignment import banded_alignment, iter_contigs
+
+
+class SeedIndex:
+    """Kmer index over a set of contigs. Every kmer occurrence is stored
+    once, sorted by kmer value, along with the contig it comes from and its
+    offset in the contig. The occurrences of a kmer are found with a binary
+    search over the sorted kmers.
+
+    parameters
+    ----------
+    kmers : np.ndarray
+        sorted uint64 kmers of all contigs
+    contig_idx : np.ndarray
+        contig index of each kmer occurrence
+    offsets : np.ndarray
+        position of each kmer occurrence in its contig
+    scaffolds : list
+        scaffold of each contig
+    contig_ids : list
+        id of each contig
+    sequences : list
+        sequence of each contig
+    k : int
+        kmer size
+
+    methods
+    -------
+    from_contigs(contigs, k):method builds the index from a set of contigs
+    lookup(kmers):method returns the occurrences of a batch of kmers
+    find_candidates(query, min_hits):method finds contigs sharing seeds with a query
+    candidate_contigs(query, min_hits):method returns the contigs sharing seeds with a query
+    """
+
+    def __init__(
+        self, kmers, contig_idx, offsets, scaffolds, contig_ids, sequences, k
+    ):
+        self.kmers = kmers
+        self.contig_idx = contig_idx
+        self.offsets = offsets
+        self.scaffolds = scaffolds
+        self.contig_ids = contig_ids
+        self.sequences = sequences
+        self.k = k
+
+    @classmethod
+    def from_contigs(cls, contigs, k=11):
+        """Builds the seed index of a set of contigs
+
+        Parameters
+        ----------
+        contigs : dict, iterable
+            contigs in any format accepted by iter_contigs()
+        k : int, optional
+            seed kmer size, by default 11
+
+        Returns
+        -------
+        SeedIndex
+            kmer index of the contigs
+        """
+        scaffolds, contig_ids, sequences = [], [], []
+        all_kmers, all_idx, all_offsets = [], [], []
+        for idx, (scaffold, contig_id, seq) in enumerate(iter_contigs(contigs)):
+            scaffolds.append(scaffold)
+            contig_ids.append(contig_id)
+            sequences.append(seq)
+
+            kmers, offsets = sequence_kmers(seq, k)
+            all_kmers.append(kmers)
+            all_offsets.append(offsets)
+            all_idx.append(np.full(len(kmers), idx, dtype=np.int32))
+
+        kmers = np.concatenate(all_kmers) if all_kmers else np.zeros(0, np.uint64)
+        order = np.argsort(kmers, kind="stable")
+        contig_idx = np.concatenate(all_idx) if all_idx else np.zeros(0, np.int32)
+        offsets = np.concatenate(all_offsets) if all_offsets else np.zeros(0, np.int64)
+
+        return cls(
+            kmers=kmers[order],
+            contig_idx=contig_idx[order],
+            offsets=offsets[order],
+            scaffolds=scaffolds,
+            contig_ids=contig_ids,
+            sequences=sequences,
+            k=k,
+        )
+
+    @property
+    def n_contigs(self) -> int:
+        """Number of indexed contigs"""
+        return len(self.sequences)
+
+    def lookup(self, kmers: np.ndarray) -> tuple:
+        """Finds the occurrences of a batch of kmers in the contigs
+
+        Parameters
+        ----------
+        kmers : np.ndarray
+            uint64 kmers to search
+
+        Returns
+        -------
+        tuple
+            (query_idx, occurrences) position in kmers of each hit and the
+            index of the hit in the kmers, contig_idx and offsets arrays
+        """
+        starts = np.searchsorted(self.kmers, kmers, side="left")
+        stops = np.searchsorted(self.kmers, kmers, side="right")
+        n_hits = stops - starts
+
+        # expanding every [start, stop) range into its occurrences
+        query_idx = np.repeat(np.arange(len(kmers)), n_hits)
+        occurrences = np.arange(n_hits.sum(), dtype=np.int64)
+        occurrences += np.repeat(starts - np.cumsum(n_hits) + n_hits, n_hits)
+        return query_idx, occurrences
+
+    def find_candidates(self, query: str, min_hits=2, diagonal_width=16) -> list:
+        """Finds the contigs that share at least min_hits seeds with the query
+        on a consistent diagonal. Diagonals (query offset - contig offset) are
+        grouped in bins of diagonal_width, so seeds separated by small
+        insertions or deletions are counted together.
+
+        Parameters
+        ----------
+        query : str
+            query sequence
+        min_hits : int, optional
+            minimum number of seeds on the same diagonal bin, by default 2
+        diagonal_width : int, optional
+            width of the diagonal bins, by default 16
+
+        Returns
+        -------
+        list
+            (contig index, diagonal, number of seeds) of each candidate
+            contig, sorted by number of seeds. The diagonal is the most
+            frequent diagonal of the best bin
+        """
+        query_kmers, query_offsets = sequence_kmers(query, self.k)
+        query_idx, occurrences = self.lookup(query_kmers)
+        if len(occurrences) == 0:
+            return []
+
+        contigs = self.contig_idx[occurrences].astype(np.int64)
+        diagonals = query_offsets[query_idx] - self.offsets[occurrences]
+
+        # counting the seeds of each (contig, diagonal bin) pair
+        bin_keys, bin_inverse, bin_counts = np.unique(
+            np.stack([contigs, diagonals // diagonal_width]),
+            axis=1,
+            return_inverse=True,
+            return_counts=True,
+        )
+        bin_inverse = bin_inverse.ravel()
+
+        # best bin of each contig: bins sorted by contig, then by seed count
+        order = np.lexsort((-bin_counts, bin_keys[0]))
+        is_first = np.ones(len(order), dtype=bool)
+        is_first[1:] = bin_keys[0, order[1:]] != bin_keys[0, order[:-1]]
+        best_bins = order[is_first]
+        best_bins = best_bins[bin_counts[best_bins] >= min_hits]
+
+        candidates = []
+        for best_bin in best_bins:
+            # most frequent diagonal of the bin
+            bin_diagonals = diagonals[bin_inverse == best_bin]
+            min_diagonal = bin_diagonals.min()
+            diagonal = min_diagonal + np.bincount(bin_diagonals - min_diagonal).argmax()
+            candidates.append(
+                (int(bin_keys[0, best_bin]), int(diagonal), int(bin_counts[best_bin]))
+            )
+
+        return sorted(candidates, key=lambda candidate: (-candidate[2], candidate[0]))
+
+    def candidate_contigs(self, query: str, min_hits=2) -> defaultdict:
+        """Returns the contigs that share seeds with the query (see
+        find_candidates()) in the format returned by run_de_bruijn(), so they
+        can be passed to run_local_alignment()
+
+        Parameters
+        ----------
+        query : str
+            query sequence
+        min_hits : int, optional
+            minimum number of seeds on the same diagonal bin, by default 2
+
+        Returns
+        -------
+        defaultdict
+            scaffold and contigs as key value pairs, in index order
+        """
+        candidates = self.find_candidates(query, min_hits)
+        contigs_data = defaultdict(None)
+        for contig in sorted([contig for contig, _, _ in candidates]):
+            scaffold = self.scaffolds[contig]
+            contigs_data.setdefault(scaffold, {})
+            contigs_data[scaffold][self.contig_ids[contig]] = self.sequences[contig]
+        return contigs_data
+
+    def __len__(self):
+        return len(self.kmers)
+
+    def __repr__(self):
+        return f"SeedIndex(k={self.k}, contigs={self.n_contigs}, seeds={len(self.kmers)})"
+
+
+def seed_and_extend(
+    query: str,
+    index: SeedIndex,
+    min_hits=2,
+    band_width=16,
+    gap=-5,
+    match=10,
+    mismatch=-4,
+) -> list:
+    """Aligns a query against the contigs of a seed index that share enough
+    seeds with it. Contigs without candidate seeds are never aligned, the
+    other ones are only aligned in a band around their seed diagonal (see
+    banded_alignment()).
+
+    Parameters
+    ----------
+    query : str
+        query sequence
+    index : SeedIndex
+        seed index of the contigs
+    min_hits : int, optional
+        minimum number of seeds on a consistent diagonal, by default 2
+    band_width : int, optional
+        number of diagonals aligned on each side of the seed diagonal,
+        by default 16
+    gap : int, optional
+        gap score, by default -5
+    match : int, optional
+        matching score, by default 10
+    mismatch : int, optional
+        mismatch score, by default -4
+
+    Returns
+    -------
+    list
+        (scaffold, contig_id, Alignment) of each candidate contig, sorted by
+        alignment score
+    """
+    results = []
+    for contig, diagonal, _ in index.find_candidates(query, min_hits):
+        alignment = banded_alignment(
+            query,
+            index.sequences[contig],
+            band_width=band_width,
+            diagonal=diagonal,
+            gap=gap,
+            match=match,
+            mismatch=mismatch,
+        )
+        results.append((index.scaffolds[contig], index.contig_ids[contig], alignment))
+
+    return sorted(results, key=lambda result: -result[2].score)
@@ -0,0 +1,261 @@
+# ------------------------------
+# encoding.py
+#
+# Module containing functions for 2-bit nucleotide encoding.
+# Nucleotides are encoded as A=0, C=1, G=2, T=3. Any other character is
+# considered ambiguous (N) and is tracked in a separate mask.
+# ------------------------------
+import numpy as np
+
+NUCLEOTIDES = "ACGT"
+AMBIGUOUS_CODE = 4
+
+# largest kmer that can be stored in a 64 bit integer
+MAX_KMER_SIZE = 32
+
+# lookup table converting ASCII characters into nucleotide codes
+ENCODING_TABLE = np.full(256, AMBIGUOUS_CODE, dtype=np.uint8)
+for _code, _nuc in enumerate(NUCLEOTIDES):
+    ENCODING_TABLE[ord(_nuc)] = _code
+    ENCODING_TABLE[ord(_nuc.lower())] = _code
+
+# lookup table converting nucleotide codes back into ASCII characters
+DECODING_TABLE = np.frombuffer(b"ACGTN", dtype=np.uint8)
+
+
+def encode_seq(seq) -> np.ndarray:
+    """Converts a sequence into an array of nucleotide codes
+
+    Parameters
+    ----------
+    seq : str, bytes
+        DNA sequence
+
+    Returns
+    -------
+    np.ndarray
+        uint8 array of nucleotide codes. Ambiguous nucleotides are set
+        to AMBIGUOUS_CODE
+    """
+    if isinstance(seq, str):
+        seq = seq.encode()
+    return ENCODING_TABLE[np.frombuffer(seq, dtype=np.uint8)]
+
+
+def decode_seq(codes: np.ndarray) -> str:
+    """Converts an array of nucleotide codes into a sequence
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        array of nucleotide codes
+
+    Returns
+    -------
+    str
+        DNA sequence, ambiguous nucleotides are returned as N
+    """
+    return DECODING_TABLE[codes].tobytes().decode()
+
+
+def pack_codes(codes: np.ndarray) -> np.ndarray:
+    """Packs nucleotide codes into bytes containing 4 nucleotides each. The
+    first nucleotide is stored in the highest two bits. Ambiguous codes are
+    stored as A and must be tracked separately.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        array of nucleotide codes
+
+    Returns
+    -------
+    np.ndarray
+        uint8 array of packed nucleotides
+    """
+    n_bytes = (len(codes) + 3) // 4
+    padded = np.zeros(n_bytes * 4, dtype=np.uint8)
+    padded[: len(codes)] = codes & 3
+    padded = padded.reshape(-1, 4)
+
+    packed = (padded[:, 0] << 6) | (padded[:, 1] << 4) | (padded[:, 2] << 2) | padded[:, 3]
+    return packed.astype(np.uint8)
+
+
+def unpack_codes(packed: np.ndarray, length: int) -> np.ndarray:
+    """Unpacks bytes created by pack_codes() into nucleotide codes
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        uint8 array of packed nucleotides
+    length : int
+        number of nucleotides
+
+    Returns
+    -------
+    np.ndarray
+        uint8 array of nucleotide codes
+    """
+    shifts = np.array([6, 4, 2, 0], dtype=np.uint8)
+    codes = (packed[:, None] >> shifts) & 3
+    return codes.reshape(-1)[:length].astype(np.uint8)
+
+
+class PackedSequence:
+    """2-bit packed representation of a DNA sequence. Ambiguous nucleotides
+    are stored in a separate bit mask.
+
+    parameters
+    ----------
+    seq:  str, bytes
+        DNA sequence
+    """
+
+    __slots__ = ["packed", "ambiguous_mask", "length"]
+
+    def __init__(self, seq):
+        codes = encode_seq(seq)
+        self.length = len(codes)
+        self.packed = pack_codes(codes)
+        self.ambiguous_mask = None
+
+        # the mask is only stored if ambiguous nucleotides are present
+        ambiguous = codes == AMBIGUOUS_CODE
+        if ambiguous.any():
+            self.ambiguous_mask = np.packbits(ambiguous)
+
+    def codes(self) -> np.ndarray:
+        """Returns the nucleotide codes of the sequence"""
+        codes = unpack_codes(self.packed, self.length)
+        if self.ambiguous_mask is not None:
+            ambiguous = np.unpackbits(self.ambiguous_mask, count=self.length)
+            codes[ambiguous.astype(bool)] = AMBIGUOUS_CODE
+        return codes
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used to store the sequence"""
+        if self.ambiguous_mask is None:
+            return self.packed.nbytes
+        return self.packed.nbytes + self.ambiguous_mask.nbytes
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return decode_seq(self.codes())
+
+    def __repr__(self):
+        return f"PackedSequence(length={self.length}, nbytes={self.nbytes})"
+
+
+def kmer_to_int(kmer: str) -> int:
+    """Converts a kmer into its 2-bit integer representation
+
+    Parameters
+    ----------
+    kmer : str
+        DNA sequence fragment containing only A, C, G or T
+
+    Returns
+    -------
+    int
+        integer representation of the kmer
+
+    Raises
+    ------
+    ValueError
+        raised if the kmer contains ambiguous nucleotides
+    """
+    value = 0
+    for code in encode_seq(kmer):
+        if code == AMBIGUOUS_CODE:
+            raise ValueError(f"kmer contains ambiguous nucleotides: {kmer}")
+        value = (value << 2) | int(code)
+    return value
+
+
+def int_to_kmer(value: int, k: int) -> str:
+    """Converts the integer representation of a kmer back into a sequence
+
+    Parameters
+    ----------
+    value : int
+        integer representation of the kmer
+    k : int
+        kmer size
+
+    Returns
+    -------
+    str
+        kmer sequence
+    """
+    nucs = []
+    for _ in range(k):
+        nucs.append(NUCLEOTIDES[value & 3])
+        value >>= 2
+    return "".join(reversed(nucs))
+
+
+def iter_kmers(seq, k: int):
+    """Yields the integer representation of every kmer in a sequence by
+    rolling the previous kmer two bits to the left. Kmers containing
+    ambiguous nucleotides are skipped.
+
+    Parameters
+    ----------
+    seq : str, bytes, np.ndarray
+        DNA sequence or array of nucleotide codes
+    k : int
+        kmer size
+
+    Yields
+    ------
+    tuple
+        (position, kmer) of each kmer
+
+    Raises
+    ------
+    ValueError
+        raised if k is larger than MAX_KMER_SIZE
+    """
+    if k > MAX_KMER_SIZE:
+        raise ValueError(f"k must be smaller or equal to {MAX_KMER_SIZE}")
+
+    codes = seq if isinstance(seq, np.ndarray) else encode_seq(seq)
+    mask = (1 << (2 * k)) - 1
+    value = 0
+    n_valid = 0
+    for pos, code in enumerate(codes.tolist()):
+        if code == AMBIGUOUS_CODE:
+            n_valid = 0
+            value = 0
+            continue
+
+        value = ((value << 2) | code) & mask
+        n_valid += 1
+        if n_valid >= k:
+            yield pos - k + 1, value
+
+
+def decode_kmers(values: np.ndarray, k: int) -> list:
+    """Converts an array of integer kmers back into sequences
+
+    Parameters
+    ----------
+    values : np.ndarray
+        uint64 array of integer kmers
+    k : int
+        kmer size
+
+    Returns
+    -------
+    list
+        kmer sequences
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    shifts = (2 * (k - 1 - np.arange(k))).astype(np.uint64)
+    codes = ((values[:, None] >> shifts) & np.uint64(3)).astype(np.uint8)
+    chars = np.ascontiguousarray(DECODING_TABLE[codes])
+    return chars.view(f"S{k}").ravel().astype(str).tolist()
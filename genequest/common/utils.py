@@ -1,4 +1,5 @@
 from datetime import datetime
+import numpy as np
 
 
 def generate_unique_id():
@@ -7,3 +8,12 @@ def generate_unique_id():
     """
     unique_id = datetime.now().strftime("%m%d%y-%H%M%S")
     return unique_id
+
+
+def lengths_to_offsets(lengths):
+    """Converts an array of lengths into the start offsets of each element
+    when all elements are stored contiguously
+    """
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    return offsets
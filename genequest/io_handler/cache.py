@@ -0,0 +1,282 @@
+# ------------------------------
+# cache.py
+#
+# Module containing a content addressed cache of assembly results.
+#
+# Cache layout:
+#   files.json                 file fingerprints and content digests
+#   manifests/<key>.json       scaffold entries of an assembled reads file
+#   scaffolds/<key>.gqc        contigs of a single scaffold (contig store)
+#
+# Scaffold entries are keyed by the content of the scaffold reads and the
+# assembly parameters, so a rerun on a reads file where a single scaffold
+# changed only reassembles that scaffold. Manifests are keyed by the content
+# of the reads file and the assembly parameters, and allow a rerun on the
+# same file to load all scaffolds without hashing the reads.
+# ------------------------------
+import os
+import json
+import hashlib
+from pathlib import Path
+import numpy as np
+
+# genequest imports
+from genequest.io_handler.read_store import ReadStore
+from genequest.io_handler.contig_store import ContigStore, ContigStoreWriter
+
+# default maximum size of the cache directory (1 GiB)
+MAX_CACHE_SIZE = 1 << 30
+
+# size of the chunks read when hashing files
+CHUNK_SIZE = 1 << 20
+
+
+def file_fingerprint(path) -> str:
+    """Returns a fingerprint of a file based on its path, size and
+    modification time. The fingerprint changes when the file is modified,
+    but does not require the file to be read.
+    """
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def file_digest(path) -> str:
+    """Returns the sha256 digest of the content of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as infile:
+        for chunk in iter(lambda: infile.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scaffold_digest(reads) -> str:
+    """Returns the sha256 digest of the headers and sequences of a set of
+    reads. ReadStore objects and iterables of FastaEntry objects containing
+    the same reads have the same digest.
+
+    Parameters
+    ----------
+    reads : ReadStore, iterable
+        ReadStore object or iterable of FastaEntry objects
+
+    Returns
+    -------
+    str
+        hexadecimal digest of the reads
+    """
+    if isinstance(reads, ReadStore):
+        reads = reads.compact()
+        seq_data = reads.seq_data.tobytes()
+        header_data = reads.header_data.tobytes()
+        lengths = reads.lengths
+        header_lengths = reads.header_lengths
+    else:
+        seqs = [entry.seq.encode() for entry in reads]
+        headers = [entry.header_id.encode() for entry in reads]
+        seq_data = b"".join(seqs)
+        header_data = b"".join(headers)
+        lengths = [len(seq) for seq in seqs]
+        header_lengths = [len(header) for header in headers]
+
+    digest = hashlib.sha256()
+    digest.update(np.asarray(lengths, dtype="<i8").tobytes())
+    digest.update(np.asarray(header_lengths, dtype="<i8").tobytes())
+    digest.update(seq_data)
+    digest.update(header_data)
+    return digest.hexdigest()
+
+
+class AssemblyCache:
+    """Content addressed cache of assembled contigs. Entries are evicted in
+    least recently used order once the cache directory exceeds max_size.
+
+    parameters
+    ----------
+    cache_dir : str, optional
+        directory containing the cache, by default "./assembly_cache"
+    max_size : int, optional
+        maximum size of the cache directory in bytes, by default MAX_CACHE_SIZE
+
+    methods
+    -------
+    params_key(**params):method returns the key of a set of assembly parameters
+    resolve_file(path):method returns the content digest of a reads file
+    load_manifest(file_key, params_key):method loads all scaffolds of a reads file
+    save_manifest(file_key, params_key, scaffold_keys):method stores the scaffolds of a reads file
+    scaffold_key(reads, params_key):method returns the key of a scaffold
+    load_scaffold(key):method loads the contigs of a scaffold
+    save_scaffold(key, scaffold, contigs):method stores the contigs of a scaffold
+    evict():method removes the least recently used entries
+    """
+
+    def __init__(self, cache_dir="./assembly_cache", max_size=MAX_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.manifest_dir = self.cache_dir / "manifests"
+        self.scaffold_dir = self.cache_dir / "scaffolds"
+        self.files_path = self.cache_dir / "files.json"
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        self.scaffold_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def params_key(**params) -> str:
+        """Returns the key of a set of assembly parameters (e.g. k, eulerian
+        and the assembler version)
+        """
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def resolve_file(self, path) -> str:
+        """Returns the content digest of a reads file. The digest of a file
+        that was not modified since it was last resolved is read from the
+        cache, otherwise the file is hashed.
+        """
+        files = self.__read_json(self.files_path) or {}
+        fingerprint = file_fingerprint(path)
+        if fingerprint not in files:
+
+            # previous fingerprints of the same file are no longer valid
+            file_path = fingerprint.rsplit(":", 2)[0]
+            files = {
+                key: digest
+                for key, digest in files.items()
+                if key.rsplit(":", 2)[0] != file_path
+            }
+            files[fingerprint] = file_digest(path)
+            self.__write_json(self.files_path, files)
+
+        return files[fingerprint]
+
+    def load_manifest(self, file_key, params_key):
+        """Loads all scaffolds assembled from a reads file
+
+        Parameters
+        ----------
+        file_key : str
+            content digest of the reads file
+        params_key : str
+            key of the assembly parameters
+
+        Returns
+        -------
+        list, NoneType
+            (scaffold, contigs) pairs in scaffold order. None if the reads
+            file was not assembled with these parameters or if one of its
+            scaffolds was evicted
+        """
+        manifest = self.__read_json(self.__manifest_path(file_key, params_key))
+        if manifest is None:
+            return None
+
+        scaffolds = []
+        for scaffold, key in manifest["scaffolds"]:
+            contigs = self.load_scaffold(key)
+            if contigs is None:
+                return None
+            scaffolds.append((scaffold, contigs))
+
+        return scaffolds
+
+    def save_manifest(self, file_key, params_key, scaffold_keys: list):
+        """Stores the scaffold entries assembled from a reads file
+
+        Parameters
+        ----------
+        file_key : str
+            content digest of the reads file
+        params_key : str
+            key of the assembly parameters
+        scaffold_keys : list
+            (scaffold, scaffold key) pairs in scaffold order
+        """
+        manifest = {"scaffolds": [list(pair) for pair in scaffold_keys]}
+        self.__write_json(self.__manifest_path(file_key, params_key), manifest)
+
+    def scaffold_key(self, reads, params_key) -> str:
+        """Returns the key of a scaffold, based on the content of its reads
+        and the assembly parameters
+        """
+        return hashlib.sha256(f"{scaffold_digest(reads)}:{params_key}".encode()).hexdigest()
+
+    def load_scaffold(self, key):
+        """Loads the contigs of a scaffold entry
+
+        Returns
+        -------
+        defaultdict, NoneType
+            contig label and contig sequence as key value pairs. None if the
+            entry is not cached
+        """
+        path = self.scaffold_dir / f"{key}.gqc"
+        if not path.exists():
+            return None
+
+        # accessed entries become the most recently used ones
+        os.utime(path)
+        with ContigStore(str(path)) as store:
+            return store.get_contigs(store.scaffold_ids[0])
+
+    def save_scaffold(self, key, scaffold, contigs: dict):
+        """Stores the contigs of a scaffold entry"""
+        path = self.scaffold_dir / f"{key}.gqc"
+        tmp_path = self.scaffold_dir / f"{key}.tmp"
+        with ContigStoreWriter(str(tmp_path)) as writer:
+            writer.add_scaffold(scaffold, contigs)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Removes the least recently used scaffold entries until the cache
+        directory is smaller than max_size. Manifests pointing to evicted
+        entries are removed as well.
+        """
+        entries = []
+        total_size = 0
+        for path in self.cache_dir.rglob("*"):
+            if path.is_file():
+                stat = path.stat()
+                total_size += stat.st_size
+                if path.parent == self.scaffold_dir:
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        evicted = set()
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            path.unlink()
+            evicted.add(path.stem)
+            total_size -= size
+
+        if len(evicted) == 0:
+            return
+
+        for path in self.manifest_dir.glob("*.json"):
+            manifest = self.__read_json(path)
+            if manifest is None or any(key in evicted for _, key in manifest["scaffolds"]):
+                path.unlink()
+
+    # -----------------
+    # Private functions
+    # -----------------
+    def __manifest_path(self, file_key, params_key):
+        """Returns the path of the manifest of a reads file"""
+        key = hashlib.sha256(f"{file_key}:{params_key}".encode()).hexdigest()
+        return self.manifest_dir / f"{key}.json"
+
+    @staticmethod
+    def __read_json(path):
+        """Reads a json file, returns None if the file does not exist"""
+        try:
+            with open(path, "r") as infile:
+                return json.load(infile)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def __write_json(path, data):
+        """Writes a json file, the file is replaced atomically"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as outfile:
+            json.dump(data, outfile)
+        os.replace(tmp_path, path)
+
+    def __repr__(self):
+        return f"AssemblyCache(cache_dir={self.cache_dir}, max_size={self.max_size})"
@@ -0,0 +1,306 @@
+# ------------------------------
+# compression.py
+#
+# Module containing readers for compressed sequence files. Files are opened
+# with open_sequence_file(), which detects the compression from the first
+# bytes of the file (not its extension):
+#
+#   plain text   opened with open()
+#   gzip         decompressed by a background thread that reads ahead of the
+#                parser
+#   BGZF         blocks are decompressed in parallel by a thread pool, up to
+#                read_ahead blocks ahead of the parser
+#
+# zlib releases the GIL while decompressing, so decompression threads run in
+# parallel with each other and with the parsing thread.
+# ------------------------------
+import io
+import os
+import gzip
+import zlib
+import queue
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# genequest imports
+from genequest.common.errors import FormatError
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# fixed part of a gzip member header, see RFC 1952
+GZIP_HEADER_SIZE = 12
+
+# number of decompressed bytes read per chunk from plain gzip files
+GZIP_CHUNK_SIZE = 1 << 20
+
+# number of decompressed chunks or blocks kept ahead of the reader per thread
+READ_AHEAD = 4
+
+
+def detect_compression(filename) -> str:
+    """Detects the compression of a file from its first bytes
+
+    Parameters
+    ----------
+    filename : str
+        path to file
+
+    Returns
+    -------
+    str
+        "bgzf", "gzip" or None if the file is not compressed
+    """
+    with open(filename, "rb") as f:
+        header = f.read(18)
+
+    if header[:2] != GZIP_MAGIC:
+        return None
+
+    # BGZF members are gzip members with a "BC" extra subfield
+    has_extra = len(header) == 18 and header[3] & 4
+    if has_extra and header[12:14] == b"BC":
+        return "bgzf"
+    return "gzip"
+
+
+def open_sequence_file(filename, threads=None, read_ahead=READ_AHEAD):
+    """Opens a plain, gzip or BGZF compressed file in text mode
+
+    Parameters
+    ----------
+    filename : str
+        path to file
+    threads : int, NoneType, optional
+        number of threads decompressing BGZF blocks. If None, all available
+        cores are used, by default None
+    read_ahead : int, optional
+        number of chunks or blocks decompressed ahead of the reader per
+        thread, by default READ_AHEAD
+
+    Returns
+    -------
+    file object
+        file opened in text mode
+    """
+    compression = detect_compression(filename)
+    if compression is None:
+        return open(filename, "r")
+
+    if threads is None:
+        threads = os.cpu_count()
+    if compression == "bgzf":
+        raw = BgzfReader(filename, threads, read_ahead * threads)
+    else:
+        raw = GzipReader(filename, read_ahead)
+
+    return io.TextIOWrapper(io.BufferedReader(raw))
+
+
+class BgzfReader(io.RawIOBase):
+    """Reads BGZF files by decompressing their blocks in parallel. Blocks are
+    read sequentially from disk and submitted to a thread pool, decompressed
+    blocks are returned in file order.
+
+    parameters
+    ----------
+    filename : str
+        path to BGZF file
+    threads : int
+        number of decompression threads
+    read_ahead : int
+        maximum number of blocks being decompressed at the same time
+
+    Raises
+    ------
+    FormatError
+        raised if a block is not a valid BGZF block
+    """
+
+    def __init__(self, filename, threads, read_ahead):
+        self.filename = filename
+        self.read_ahead = max(read_ahead, 1)
+        self.__file = open(filename, "rb")
+        self.__executor = ThreadPoolExecutor(max_workers=max(threads, 1))
+        self.__pending = deque()
+        self.__buffer = b""
+        self.__buffer_pos = 0
+        self.__eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """Copies decompressed data into buffer, returns the number of bytes
+        copied (0 at the end of the file)
+        """
+        while self.__buffer_pos == len(self.__buffer):
+            self.__fill()
+            if len(self.__pending) == 0:
+                return 0
+            self.__buffer = self.__pending.popleft().result()
+            self.__buffer_pos = 0
+
+        size = min(len(buffer), len(self.__buffer) - self.__buffer_pos)
+        buffer[:size] = self.__buffer[self.__buffer_pos : self.__buffer_pos + size]
+        self.__buffer_pos += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            for future in self.__pending:
+                future.cancel()
+            self.__executor.shutdown()
+            self.__file.close()
+        super().close()
+
+    # -----------------
+    # Private functions
+    # -----------------
+    def __fill(self):
+        """Submits blocks until read_ahead blocks are being decompressed"""
+        while not self.__eof and len(self.__pending) < self.read_ahead:
+            block = self.__read_block()
+            if block is None:
+                self.__eof = True
+                break
+            self.__pending.append(self.__executor.submit(_inflate_block, block))
+
+    def __read_block(self):
+        """Reads the next compressed block, returns None at the end of the file"""
+        header = self.__file.read(GZIP_HEADER_SIZE)
+        if len(header) == 0:
+            return None
+        if len(header) < GZIP_HEADER_SIZE or header[:2] != GZIP_MAGIC:
+            raise FormatError(f"{self.filename} contains an invalid BGZF block")
+
+        (extra_size,) = struct.unpack("<H", header[10:12])
+        extra = self.__file.read(extra_size)
+
+        # searching the BC subfield containing the block size
+        pos = 0
+        block_size = None
+        while pos + 4 <= len(extra):
+            field_id = extra[pos : pos + 2]
+            (field_size,) = struct.unpack("<H", extra[pos + 2 : pos + 4])
+            if field_id == b"BC" and field_size == 2:
+                (block_size,) = struct.unpack("<H", extra[pos + 4 : pos + 6])
+            pos += 4 + field_size
+        if block_size is None:
+            raise FormatError(f"{self.filename} contains an invalid BGZF block")
+
+        # the block size includes the header, the extra field and the trailer
+        data = self.__file.read(block_size + 1 - GZIP_HEADER_SIZE - extra_size)
+        if len(data) != block_size + 1 - GZIP_HEADER_SIZE - extra_size:
+            raise FormatError(f"{self.filename} is truncated")
+        return data
+
+
+def _inflate_block(data: bytes) -> bytes:
+    """Decompresses the deflate data of a BGZF block and checks its CRC32
+
+    Parameters
+    ----------
+    data : bytes
+        compressed data followed by the CRC32 and the size of the block
+
+    Returns
+    -------
+    bytes
+        decompressed data
+
+    Raises
+    ------
+    FormatError
+        raised if the data can not be decompressed or fails the CRC32 check
+    """
+    crc, size = struct.unpack("<II", data[-8:])
+    try:
+        block = zlib.decompress(data[:-8], wbits=-15)
+    except zlib.error:
+        raise FormatError("BGZF block failed its integrity check")
+    if len(block) != size or zlib.crc32(block) != crc:
+        raise FormatError("BGZF block failed its integrity check")
+    return block
+
+
+class GzipReader(io.RawIOBase):
+    """Reads gzip files while a background thread decompresses the next
+    chunks. gzip members can only be decompressed sequentially, the thread
+    allows decompression to run while the previous chunks are parsed.
+
+    parameters
+    ----------
+    filename : str
+        path to gzip file
+    read_ahead : int
+        maximum number of decompressed chunks waiting to be read
+    """
+
+    def __init__(self, filename, read_ahead):
+        self.filename = filename
+        self.__chunks = queue.Queue(maxsize=max(read_ahead, 1))
+        self.__stop = threading.Event()
+        self.__buffer = b""
+        self.__buffer_pos = 0
+        self.__eof = False
+        self.__thread = threading.Thread(target=self.__decompress, daemon=True)
+        self.__thread.start()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """Copies decompressed data into buffer, returns the number of bytes
+        copied (0 at the end of the file)
+        """
+        while self.__buffer_pos == len(self.__buffer):
+            if self.__eof:
+                return 0
+            chunk = self.__chunks.get()
+            if isinstance(chunk, Exception):
+                self.__eof = True
+                raise chunk
+            if len(chunk) == 0:
+                self.__eof = True
+                return 0
+            self.__buffer = chunk
+            self.__buffer_pos = 0
+
+        size = min(len(buffer), len(self.__buffer) - self.__buffer_pos)
+        buffer[:size] = self.__buffer[self.__buffer_pos : self.__buffer_pos + size]
+        self.__buffer_pos += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.__stop.set()
+            self.__thread.join()
+        super().close()
+
+    # -----------------
+    # Private functions
+    # -----------------
+    def __decompress(self):
+        """Decompresses the file into the chunk queue, an empty chunk marks
+        the end of the file
+        """
+        try:
+            with gzip.open(self.filename, "rb") as f:
+                while not self.__stop.is_set():
+                    chunk = f.read(GZIP_CHUNK_SIZE)
+                    self.__put(chunk)
+                    if len(chunk) == 0:
+                        break
+        except (OSError, EOFError, zlib.error) as e:
+            self.__put(e)
+
+    def __put(self, item):
+        """Adds an item to the queue unless the reader was closed"""
+        while not self.__stop.is_set():
+            try:
+                self.__chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
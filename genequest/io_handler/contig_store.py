@@ -0,0 +1,303 @@
+# ------------------------------
+# contig_store.py
+#
+# Module containing a binary storage format for assembled contigs.
+#
+# File layout:
+#   [magic][version]                      file header
+#   [packed sequences ...]                written as scaffolds are added
+#   [table]                               written when the store is closed
+#   [table offset][magic]                 trailer
+#
+# Sequences are 2-bit packed (see genequest.common.encoding), followed by a
+# packed bit mask when they contain ambiguous nucleotides. The table holds
+# the scaffold and contig ids along with the position of every contig in
+# the sequence section, so single scaffolds can be read without reading
+# the rest of the file.
+# ------------------------------
+import mmap
+import struct
+from collections import defaultdict
+import numpy as np
+
+# genequest imports
+from genequest.common.errors import FormatError
+from genequest.common.encoding import (
+    AMBIGUOUS_CODE,
+    encode_seq,
+    decode_seq,
+    pack_codes,
+    unpack_codes,
+)
+
+STORE_MAGIC = b"GQCS"
+STORE_VERSION = 1
+HEADER_FORMAT = "<4sI"
+TRAILER_FORMAT = "<Q4s"
+
+
+class ContigStoreWriter:
+    """Writes contigs into a binary contig store. Scaffolds are written as
+    soon as they are added, only the table describing them is kept in memory
+    until the store is closed.
+
+    parameters
+    ----------
+    path : str
+        path of the contig store file
+
+    methods
+    -------
+    add_scaffold(scaffold, contigs):method writes the contigs of a scaffold
+    close():method writes the table and closes the file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = open(path, "wb")
+        self.handle.write(struct.pack(HEADER_FORMAT, STORE_MAGIC, STORE_VERSION))
+
+        # table entries
+        self.scaffold_ids = []
+        self.contig_ids = []
+        self.scaffold_codes = []
+        self.offsets = []
+        self.lengths = []
+        self.mask_offsets = []
+
+    def add_scaffold(self, scaffold, contigs: dict):
+        """Writes the contigs of a scaffold
+
+        Parameters
+        ----------
+        scaffold : str
+            scaffold id
+        contigs : dict
+            contig label and contig sequence as key value pairs
+        """
+        code = len(self.scaffold_ids)
+        self.scaffold_ids.append(scaffold)
+        for contig_id, seq in contigs.items():
+            codes = encode_seq(seq)
+            self.scaffold_codes.append(code)
+            self.contig_ids.append(contig_id)
+            self.lengths.append(len(codes))
+            self.offsets.append(self.handle.tell())
+            self.handle.write(pack_codes(codes).tobytes())
+
+            # the mask is only stored if ambiguous nucleotides are present
+            ambiguous = codes == AMBIGUOUS_CODE
+            if ambiguous.any():
+                self.mask_offsets.append(self.handle.tell())
+                self.handle.write(np.packbits(ambiguous).tobytes())
+            else:
+                self.mask_offsets.append(-1)
+
+    def close(self):
+        """Writes the table and the trailer and closes the file"""
+        if self.handle.closed:
+            return
+
+        table_offset = self.handle.tell()
+        counts = np.array([len(self.scaffold_ids), len(self.contig_ids)], dtype="<i8")
+        self.handle.write(counts.tobytes())
+        self.handle.write(np.array(self.scaffold_codes, dtype="<i4").tobytes())
+        self.handle.write(np.array(self.offsets, dtype="<i8").tobytes())
+        self.handle.write(np.array(self.lengths, dtype="<i8").tobytes())
+        self.handle.write(np.array(self.mask_offsets, dtype="<i8").tobytes())
+        for ids in (self.scaffold_ids, self.contig_ids):
+            blob = "\n".join([str(id_) for id_ in ids]).encode()
+            self.handle.write(struct.pack("<Q", len(blob)))
+            self.handle.write(blob)
+
+        self.handle.write(struct.pack(TRAILER_FORMAT, table_offset, STORE_MAGIC))
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f"ContigStoreWriter(path={self.path}, scaffolds={len(self.scaffold_ids)})"
+
+
+class ContigStore:
+    """Reads a binary contig store. The file is memory mapped and only the
+    table is parsed when the store is opened, contig sequences are decoded
+    when they are requested.
+
+    parameters
+    ----------
+    path : str
+        path of the contig store file
+
+    methods
+    -------
+    get_contigs(scaffold):method returns the contigs of a scaffold
+    to_dict(scaffolds):method returns the contigs of multiple scaffolds
+    close():method closes the memory mapped file
+
+    Raises
+    ------
+    FormatError
+        raised if the file is not a contig store
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = open(path, "rb")
+        self.mm = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__read_table()
+
+    @staticmethod
+    def is_contig_store(path) -> bool:
+        """Checks if a file starts with the contig store header"""
+        with open(path, "rb") as f:
+            header = f.read(struct.calcsize(HEADER_FORMAT))
+        return header[:4] == STORE_MAGIC
+
+    def get_contigs(self, scaffold) -> defaultdict:
+        """Returns the contigs of a scaffold
+
+        Parameters
+        ----------
+        scaffold : str
+            scaffold id
+
+        Returns
+        -------
+        defaultdict
+            contig label and contig sequence as key value pairs
+
+        Raises
+        ------
+        KeyError
+            raised if the scaffold is not in the store
+        """
+        beg, end = self.scaffold_ranges[scaffold]
+        contigs = defaultdict(None)
+        for idx in range(beg, end):
+            contigs[self.contig_ids[idx]] = self.get_seq(idx)
+        return contigs
+
+    def get_seq(self, idx) -> str:
+        """Decodes the sequence of a single contig"""
+        length = int(self.lengths[idx])
+        offset = int(self.offsets[idx])
+        packed = np.frombuffer(self.mm[offset : offset + (length + 3) // 4], np.uint8)
+        codes = unpack_codes(packed, length)
+
+        mask_offset = int(self.mask_offsets[idx])
+        if mask_offset >= 0:
+            mask_end = mask_offset + (length + 7) // 8
+            mask = np.frombuffer(self.mm[mask_offset:mask_end], np.uint8)
+            codes[np.unpackbits(mask, count=length).astype(bool)] = AMBIGUOUS_CODE
+
+        return decode_seq(codes)
+
+    def to_dict(self, scaffolds=None) -> defaultdict:
+        """Returns the contigs of multiple scaffolds in the format returned by
+        run_de_bruijn()
+
+        Parameters
+        ----------
+        scaffolds : list, optional
+            scaffold ids to read. If None, all scaffolds are read,
+            by default None
+
+        Returns
+        -------
+        defaultdict
+            scaffold and contigs as key value pairs
+        """
+        if scaffolds is None:
+            scaffolds = self.scaffold_ids
+
+        contigs_data = defaultdict(None)
+        for scaffold in scaffolds:
+            contigs_data[scaffold] = self.get_contigs(scaffold)
+        return contigs_data
+
+    def close(self):
+        """Closes the memory mapped file"""
+        if not self.handle.closed:
+            self.mm.close()
+            self.handle.close()
+
+    # -----------------
+    # Private functions
+    # -----------------
+    def __read_table(self):
+        """Parses the table that is stored at the end of the file"""
+        header_size = struct.calcsize(HEADER_FORMAT)
+        trailer_size = struct.calcsize(TRAILER_FORMAT)
+        if len(self.mm) < header_size + trailer_size:
+            self.close()
+            raise FormatError(f"{self.path} is not a contig store")
+
+        magic, version = struct.unpack_from(HEADER_FORMAT, self.mm, 0)
+        table_offset, end_magic = struct.unpack_from(
+            TRAILER_FORMAT, self.mm, len(self.mm) - trailer_size
+        )
+        if magic != STORE_MAGIC or end_magic != STORE_MAGIC:
+            self.close()
+            raise FormatError(f"{self.path} is not a complete contig store")
+        if version != STORE_VERSION:
+            self.close()
+            raise FormatError(f"unsupported contig store version: {version}")
+
+        # the table is copied out of the mapping so the file can be closed
+        # while the table is still in use
+        pos = table_offset
+        n_scaffolds, n_contigs = struct.unpack_from("<qq", self.mm, pos)
+        pos += 16
+        self.scaffold_codes = np.frombuffer(
+            self.mm, dtype="<i4", count=n_contigs, offset=pos
+        ).copy()
+        pos += 4 * n_contigs
+        arrays = []
+        for _ in range(3):
+            arrays.append(
+                np.frombuffer(self.mm, dtype="<i8", count=n_contigs, offset=pos).copy()
+            )
+            pos += 8 * n_contigs
+        self.offsets, self.lengths, self.mask_offsets = arrays
+
+        ids = []
+        for count in (n_scaffolds, n_contigs):
+            (blob_size,) = struct.unpack_from("<Q", self.mm, pos)
+            pos += 8
+            blob = self.mm[pos : pos + blob_size].decode()
+            pos += blob_size
+            ids.append(blob.split("\n") if count > 0 else [])
+        self.scaffold_ids, self.contig_ids = ids
+
+        # contigs of a scaffold are stored contiguously
+        self.scaffold_ranges = {}
+        bounds = np.searchsorted(self.scaffold_codes, np.arange(n_scaffolds + 1))
+        for code, scaffold in enumerate(self.scaffold_ids):
+            self.scaffold_ranges[scaffold] = (int(bounds[code]), int(bounds[code + 1]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Allow python functionallity support
+    def __len__(self):
+        return len(self.scaffold_ids)
+
+    def __contains__(self, scaffold):
+        return scaffold in self.scaffold_ranges
+
+    def __iter__(self):
+        return iter(self.scaffold_ids)
+
+    def __getitem__(self, scaffold):
+        return self.get_contigs(scaffold)
+
+    def __repr__(self):
+        return f"ContigStore(path={self.path}, scaffolds={len(self.scaffold_ids)}, contigs={len(self.contig_ids)})"
@@ -0,0 +1,272 @@
+# ------------------------------
+# fastq.py
+#
+# Module containing functions for parsing FASTQ files. Entries are returned
+# as FastqEntry objects, which extend FastaEntry objects with the quality
+# string of the read, so FASTQ reads can be used wherever FASTA reads are.
+#
+# Reads can be quality trimmed while they are streamed: the read is cut at
+# the first sliding window whose mean quality is below a threshold.
+# ------------------------------
+import numpy as np
+
+# genequest imports
+from genequest.common.errors import FormatError
+from genequest.common.utils import lengths_to_offsets
+from genequest.io_handler.compression import open_sequence_file
+from genequest.io_handler.parser import FastaEntry, FastaReader, parse_scaffold_id
+
+# phred quality offset of the quality strings (Sanger / Illumina 1.8+)
+PHRED_OFFSET = 33
+
+# number of reads trimmed at once while streaming
+TRIM_BATCH_SIZE = 10000
+
+
+class FastqEntry(FastaEntry):
+    """Class object that contains the FASTQ entry information"""
+
+    __slots__ = ["qual"]
+
+    def __init__(self, header_id, scaffold_id, seq, qual):
+        super().__init__(header_id, scaffold_id, seq)
+        self.qual = qual
+
+    def __str__(self):
+        """String representation of the data type"""
+        str_rep = f"FastqEntry(header_id='{self.header_id}', scaffold_id='{self.scaffold_id}', seq='{self.seq}', qual='{self.qual}', beg_pos='{self.beg_pos}', end_pos='{self.end_pos}')"
+        return str_rep
+
+
+def quality_trim_lengths(
+    quals: np.ndarray, lengths: np.ndarray, min_quality: int, window_size=4
+) -> np.ndarray:
+    """Computes the trimmed length of a batch of reads. Each read is cut at
+    the start of its first window of window_size bases whose mean quality is
+    below min_quality. Reads shorter than the window are evaluated as a
+    single window.
+
+    Parameters
+    ----------
+    quals : np.ndarray
+        phred quality scores of all reads, concatenated
+    lengths : np.ndarray
+        length of each read
+    min_quality : int
+        minimum mean quality of a window
+    window_size : int, optional
+        number of bases per window, by default 4
+
+    Returns
+    -------
+    np.ndarray
+        trimmed length of each read
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = lengths_to_offsets(lengths)
+    ends = starts + lengths
+    cumulative = np.zeros(len(quals) + 1, dtype=np.int64)
+    np.cumsum(quals, out=cumulative[1:])
+
+    # windows are not allowed to cross read boundaries
+    positions = np.arange(len(quals), dtype=np.int64)
+    read_idx = np.repeat(np.arange(len(lengths)), lengths)
+    read_ends = ends[read_idx]
+    window_ends = np.minimum(positions + window_size, read_ends)
+    valid = (positions + window_size <= read_ends) | (positions == starts[read_idx])
+
+    # mean < min_quality, compared on sums to stay in integers
+    window_sums = cumulative[window_ends] - cumulative[positions]
+    failed = valid & (window_sums < min_quality * (window_ends - positions))
+
+    # the first failing window of each read sets its trimmed length
+    failed_positions = np.flatnonzero(failed)
+    failed_reads, first = np.unique(read_idx[failed_positions], return_index=True)
+    trimmed_lengths = lengths.copy()
+    trimmed_lengths[failed_reads] = failed_positions[first] - starts[failed_reads]
+    return trimmed_lengths
+
+
+def iter_fastq(
+    filename,
+    min_quality=None,
+    window_size=4,
+    min_length=1,
+    phred_offset=PHRED_OFFSET,
+    batch_size=TRIM_BATCH_SIZE,
+    threads=None,
+):
+    """Streams a FASTQ file and yields one FastqEntry at a time. gzip and
+    BGZF compressed files are decompressed while they are parsed.
+
+    If min_quality is set, reads are quality trimmed in batches of batch_size
+    reads, see quality_trim_lengths(). Reads shorter than min_length after
+    trimming are discarded.
+
+    Parameters
+    ----------
+    filename : str
+        path to FASTQ file
+    min_quality : int, NoneType, optional
+        minimum mean quality of a window. If None, reads are not trimmed,
+        by default None
+    window_size : int, optional
+        number of bases per trimming window, by default 4
+    min_length : int, optional
+        minimum read length after trimming, by default 1
+    phred_offset : int, optional
+        offset of the quality characters, by default PHRED_OFFSET
+    batch_size : int, optional
+        number of reads trimmed at once, by default TRIM_BATCH_SIZE
+    threads : int, NoneType, optional
+        number of threads decompressing BGZF files. If None, all available
+        cores are used, by default None
+
+    Yields
+    ------
+    FastqEntry
+        parsed (and trimmed) FASTQ entry
+
+    Raises
+    ------
+    FormatError
+        raised if input file is not a FASTQ file
+    """
+    with open_sequence_file(filename, threads=threads) as f:
+        records = _scan_fastq_records(f)
+        if min_quality is None:
+            for header, seq, qual in records:
+                if len(seq) >= min_length:
+                    yield _to_fastq_entry(header, seq, qual)
+            return
+
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_size:
+                yield from _trim_batch(batch, min_quality, window_size, min_length, phred_offset)
+                batch = []
+        yield from _trim_batch(batch, min_quality, window_size, min_length, phred_offset)
+
+
+def is_fastq(filename) -> bool:
+    """Checks if a (possibly compressed) file starts with a FASTQ header"""
+    with open_sequence_file(filename, threads=1) as f:
+        for line in f:
+            if line.strip():
+                return line.startswith("@")
+    return False
+
+
+class FastqReader(FastaReader):
+    """Class that is used for parsing FASTQ files. Shares the interface of
+    FastaReader, entries are FastqEntry objects.
+
+    parameters
+    ----------
+    filename:  str
+        path that leads to FASTQ file, plain or gzip/BGZF compressed
+    min_quality : int, NoneType, optional
+        minimum mean quality of a trimming window. If None, reads are not
+        trimmed, by default None
+    window_size : int, optional
+        number of bases per trimming window, by default 4
+    min_length : int, optional
+        minimum read length after trimming, by default 1
+    phred_offset : int, optional
+        offset of the quality characters, by default PHRED_OFFSET
+
+    methods
+    -------
+    stream(filename):method yields FastqEntry objects without loading the whole file
+    """
+
+    def __init__(
+        self,
+        filename,
+        min_quality=None,
+        window_size=4,
+        min_length=1,
+        phred_offset=PHRED_OFFSET,
+    ):
+        self.min_quality = min_quality
+        self.window_size = window_size
+        self.min_length = min_length
+        self.phred_offset = phred_offset
+        super().__init__(filename)
+
+    @staticmethod
+    def stream(filename, **kwargs):
+        """Yields FastqEntry objects one at a time without loading the whole
+        file into memory. See iter_fastq()
+        """
+        return iter_fastq(filename, **kwargs)
+
+    def _iter_entries(self):
+        """Yields the (trimmed) entries of the FASTQ file"""
+        return iter_fastq(
+            self.filename,
+            min_quality=self.min_quality,
+            window_size=self.window_size,
+            min_length=self.min_length,
+            phred_offset=self.phred_offset,
+        )
+
+    # -- printing support
+    def __repr__(self):
+        return f"FastqReader(filename={self.filename}, entries={self.n_entries})"
+
+    def __str__(self):
+        return f"FastqReader: Filename: '{self.filename}' has {self.n_entries} entries"
+
+
+def _scan_fastq_records(handle):
+    """Yields the raw header, sequence and quality string of every record of
+    an opened FASTQ file. Records must have the 4 line layout.
+
+    Raises
+    ------
+    FormatError
+        raised if a record is incomplete or if its sequence and quality
+        strings have different lengths
+    """
+    lines = iter(handle)
+    for header in lines:
+        header = header.rstrip()
+        if not header:
+            continue
+
+        seq = next(lines, "").strip()
+        separator = next(lines, "")
+        qual = next(lines, "").strip()
+        if not header.startswith("@") or not separator.startswith("+"):
+            raise FormatError("Invalid FASTQ file")
+        if len(seq) != len(qual):
+            raise FormatError(f"{header} has sequence and quality of different lengths")
+
+        yield header, seq, qual
+
+
+def _to_fastq_entry(header, seq, qual):
+    """Converts a raw header, sequence and quality into a FastqEntry"""
+    header_id = header.strip()[1:]
+    scaffold_id = parse_scaffold_id(header_id)
+    return FastqEntry(header_id, scaffold_id, seq, qual)
+
+
+def _trim_batch(batch, min_quality, window_size, min_length, phred_offset):
+    """Quality trims a batch of raw records and yields the FastqEntry objects
+    of the reads that are long enough
+    """
+    if len(batch) == 0:
+        return
+
+    quals = np.frombuffer("".join([qual for _, _, qual in batch]).encode(), np.uint8)
+    lengths = np.array([len(qual) for _, _, qual in batch], dtype=np.int64)
+    trimmed_lengths = quality_trim_lengths(
+        quals.astype(np.int64) - phred_offset, lengths, min_quality, window_size
+    )
+
+    for (header, seq, qual), length in zip(batch, trimmed_lengths.tolist()):
+        if length >= min_length:
+            yield _to_fastq_entry(header, seq[:length], qual[:length])
@@ -5,41 +5,62 @@ from pathlib import Path
 
 # genequest imports
 import genequest.common.utils as utils
+from genequest.io_handler.contig_store import ContigStore, ContigStoreWriter
 
+# extension of the binary contig store files
+STORE_EXTENSION = "gqc"
 
-def save_contigs(contigs_data: dict, outfile="contigs_data"):
-    """Serializes contigs data into a pickle file
+
+def open_contig_store(outfile="contigs_data") -> ContigStoreWriter:
+    """Creates a new contig store inside the contig_data/ directory. Scaffolds
+    can be added to the returned writer as soon as they are assembled.
 
     Parameters
     ----------
-    contigs_data : dict
-        dictionary containing contig data
     outfile : str, optional
-        name of the compressed file, by default "contigs_data"
-    """
-    path_check = os.path.join(os.getcwd(), f"{outfile}.pickle")
-    if os.path.exists(path_check) is False:
-        e_msg = "File exists, use other outname"
-        FileExistsError(e_msg)
+        name of the contig store, by default "contigs_data"
 
-    # saving contigs data
+    Returns
+    -------
+    ContigStoreWriter
+        writer of the contig store, must be closed once all scaffolds are added
+    """
     path = Path("./contig_data")
     path.mkdir(exist_ok=True)
 
     uid = utils.generate_unique_id()
-    outname = f"{path.stem}/{outfile}_{uid}.pickle"
-    with open(outname, "wb") as outfile:
-        pickle.dump(contigs_data, outfile)
+    outname = f"{path.stem}/{outfile}_{uid}.{STORE_EXTENSION}"
+    return ContigStoreWriter(outname)
+
+
+def save_contigs(contigs_data: dict, outfile="contigs_data"):
+    """Writes contigs data into a binary contig store
 
+    Parameters
+    ----------
+    contigs_data : dict
+        dictionary containing contig data
+    outfile : str, optional
+        name of the contig store, by default "contigs_data"
+    """
+    with open_contig_store(outfile) as writer:
+        for scaffold, contigs in contigs_data.items():
+            writer.add_scaffold(scaffold, contigs)
 
-def load_contigs(contigs_data_path=None) -> dict:
-    """Loads in contig data from pickle files
+
+def load_contigs(contigs_data_path=None, scaffold=None) -> dict:
+    """Loads in contig data from a contig store. Pickle files written by
+    previous versions are still supported.
 
     Parameters
     ----------
     contigs_data_path : str, NoneType, optional
-        Path to pickle file containing contig data. if None, the latest
+        Path to the file containing contig data. if None, the latest
         contig file will be open. , by default None
+    scaffold : str, list, NoneType, optional
+        scaffold id or list of scaffold ids to load. With contig stores only
+        the requested scaffolds are read from disk. If None, all scaffolds
+        are loaded, by default None
 
     Returns
     -------
@@ -50,33 +71,33 @@ def load_contigs(contigs_data_path=None) -> dict:
     ------
     FileNotFoundError
         unable to find specified path to contig file
-    RuntimeError
-        if more than latest files were found
     """
 
     # if contigs_data_path is None, by default is searches for the latest
     if contigs_data_path is None:
+        contig_files = glob.glob(f"contig_data/*.{STORE_EXTENSION}")
+        contig_files += glob.glob("contig_data/*.pickle")
+        if len(contig_files) == 0:
+            raise FileNotFoundError("unable to find contig data files")
+
+        contigs_data_path = max(contig_files, key=os.path.getctime)
+        print(f"loading contig data: {contigs_data_path}")
 
-        # searching for latest file
-        search_path = "contig_data/*.pickle"
-        pickle_files = glob.glob(search_path)
-        latest_file = max(pickle_files, key=os.path.getctime)
-        if len(latest_file) == 1:
-            raise RuntimeError("More than 2 latest files found")
-
-        # opening latest file and returning dictionary of contig data
-        print(f"loading contig data: {latest_file}")
-        with open(latest_file, "rb") as infile:
-            contigs_data = pickle.load(infile)
-            return contigs_data
-
-    # loading pickle file and returning a dictionary
-    path_check = os.path.exists(contigs_data_path)
-    if path_check is False:
-        e_msg = "unable to find pickle file"
+    elif os.path.exists(contigs_data_path) is False:
+        e_msg = "unable to find contig data file"
         raise FileNotFoundError(e_msg)
 
+    scaffolds = [scaffold] if isinstance(scaffold, str) else scaffold
+
+    if ContigStore.is_contig_store(contigs_data_path):
+        with ContigStore(contigs_data_path) as store:
+            return store.to_dict(scaffolds)
+
+    # legacy pickle files are loaded entirely
     print(f"opening pickle file: {contigs_data_path}")
     with open(contigs_data_path, "rb") as infile:
         contigs_data = pickle.load(infile)
-        return contigs_data
+
+    if scaffolds is not None:
+        contigs_data = {scaffold: contigs_data[scaffold] for scaffold in scaffolds}
+    return contigs_data
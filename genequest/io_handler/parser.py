@@ -1,11 +1,28 @@
-from collections import defaultdict
+import os
+import sys
+import mmap
+from collections import defaultdict, namedtuple
+from collections.abc import Sequence
+import numpy as np
 from genequest.common.errors import FormatError
+from genequest.io_handler.compression import detect_compression, open_sequence_file
+
+# number of characters read from disk per chunk when scanning FASTA files
+CHUNK_SIZE = 1 << 20
+
+# faidx-style index record of a single FASTA entry
+# -- offset: byte offset of the first base of the sequence
+# -- line_bases: number of bases per sequence line
+# -- line_width: number of bytes per sequence line (including the newline)
+FaidxRecord = namedtuple(
+    "FaidxRecord", ["header_id", "length", "offset", "line_bases", "line_width"]
+)
 
 
 class FastaEntry:
     """Class object that contains the FASTA entry information"""
 
-    __slot__ = ["header_id", "scafold_id", "seq", "beg_pos", "end_pos"]
+    __slots__ = ["header_id", "scaffold_id", "seq", "beg_pos", "end_pos"]
 
     def __init__(self, header_id, scaffold_id, seq):
         self.header_id = header_id
@@ -26,6 +43,221 @@ class FastaEntry:
         return len(self.seq)
 
 
+def iter_fasta(filename, chunk_size=CHUNK_SIZE, threads=None):
+    """Streams a FASTA file and yields one FastaEntry at a time. Only the
+    record that is currently being parsed is held in memory, which allows
+    large read sets to be consumed as they are read from disk.
+
+    Sequences that are wrapped across multiple lines (e.g. 60 or 80 columns)
+    are joined back into a single sequence. gzip and BGZF compressed files
+    are decompressed while they are parsed, see open_sequence_file().
+
+    Parameters
+    ----------
+    filename : str
+        path to FASTA file
+    chunk_size : int, optional
+        number of characters read per chunk, by default CHUNK_SIZE
+    threads : int, NoneType, optional
+        number of threads decompressing BGZF files. If None, all available
+        cores are used, by default None
+
+    Yields
+    ------
+    FastaEntry
+        parsed FASTA entry
+
+    Raises
+    ------
+    FormatError
+        raised if input file is not a FASTA file
+    """
+    with open_sequence_file(filename, threads=threads) as f:
+        for header, seq in _scan_records(f, chunk_size):
+            yield _to_fasta_entry(header, seq)
+
+
+def _scan_records(handle, chunk_size=CHUNK_SIZE):
+    """Scans an opened FASTA file in fixed size chunks and yields the raw
+    header and sequence of every record. Sequence lines are collected per
+    record and joined only once the next header (or the end of the file) is
+    found.
+
+    Parameters
+    ----------
+    handle : file object
+        opened FASTA file in text mode
+    chunk_size : int, optional
+        number of characters read per chunk, by default CHUNK_SIZE
+
+    Yields
+    ------
+    tuple
+        (header, seq) of each record
+
+    Raises
+    ------
+    FormatError
+        raised if sequence data is found before the first header
+    """
+    header = None
+    seq_lines = []
+    remainder = ""
+    while True:
+        chunk = handle.read(chunk_size)
+
+        # the last line of a chunk can be incomplete, it is carried over
+        # into the next chunk. Once the file is exhausted it is flushed.
+        if chunk:
+            lines = (remainder + chunk).split("\n")
+            remainder = lines.pop()
+        else:
+            lines = [remainder]
+
+        for line in lines:
+            if line.startswith(">"):
+                if header is not None:
+                    yield header, "".join(seq_lines)
+                header = line.rstrip()
+                seq_lines = []
+                continue
+
+            line = line.strip()
+            if not line:
+                continue
+            if header is None:
+                raise FormatError("Invalid FASTA file")
+            seq_lines.append(line)
+
+        if not chunk:
+            break
+
+    if header is not None:
+        yield header, "".join(seq_lines)
+
+
+def group_by_scaffold(entries) -> dict:
+    """Groups FASTA entries based on their scaffold. Accepts any iterable of
+    FastaEntry objects, including the generator returned by iter_fasta()
+
+    Parameters
+    ----------
+    entries : iterable
+        FastaEntry objects
+
+    Returns
+    -------
+    dict
+        scafold and FastaEntries as key value pairs
+    """
+    grouped_entries = defaultdict(list)
+    for entry in entries:
+        grouped_entries[entry.scaffold_id].append(entry)
+
+    return grouped_entries
+
+
+def parse_scaffold_id(header_id: str) -> str:
+    """Returns the scaffold id of a header (the text before the first ":").
+    Scaffold ids are interned, so reads of the same scaffold share a single
+    string object.
+    """
+    return sys.intern(header_id.partition(":")[0])
+
+
+def _to_fasta_entry(header, seq):
+    """Converts a raw header and joined sequence into a FastaEntry"""
+
+    # removing unwanted formating
+    header_id = header.strip().replace(">", "")
+    scaffold_id = parse_scaffold_id(header_id)
+
+    return FastaEntry(header_id, scaffold_id, seq)
+
+
+def build_scaffold_index(scaffold_ids) -> tuple:
+    """Stable sorts items by scaffold, so the items of every scaffold are
+    stored in a contiguous range. Scaffolds are ordered by first appearance
+    and items keep their input order within a scaffold.
+
+    Parameters
+    ----------
+    scaffold_ids : list
+        scaffold id of each item
+
+    Returns
+    -------
+    tuple
+        (order, ranges) position of the items sorted by scaffold and
+        scaffold and (beg, end) range in order as key value pairs
+    """
+    scaffold_codes = {}
+    codes = np.fromiter(
+        (scaffold_codes.setdefault(scaffold, len(scaffold_codes)) for scaffold in scaffold_ids),
+        dtype=np.int64,
+        count=len(scaffold_ids),
+    )
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(scaffold_codes) + 1))
+
+    ranges = {}
+    for scaffold, code in scaffold_codes.items():
+        ranges[scaffold] = (int(bounds[code]), int(bounds[code + 1]))
+    return order.tolist(), ranges
+
+
+class EntryView(Sequence):
+    """Read-only view over the contiguous range [beg, end) of a list. Items
+    are converted with getter when they are accessed, if provided.
+
+    parameters
+    ----------
+    items : list
+        items sorted by scaffold
+    beg : int
+        first position of the view
+    end : int
+        last position of the view (exclusive)
+    getter : callable, optional
+        converts items into entries (e.g. header ids into FastaEntry objects),
+        by default None
+    """
+
+    __slots__ = ["items", "beg", "end", "getter"]
+
+    def __init__(self, items, beg, end, getter=None):
+        self.items = items
+        self.beg = beg
+        self.end = end
+        self.getter = getter
+
+    def __len__(self):
+        return self.end - self.beg
+
+    def __getitem__(self, val):
+        if isinstance(val, slice):
+            beg, end, step = val.indices(len(self))
+            if step != 1:
+                return [self[idx] for idx in range(beg, end, step)]
+            return EntryView(self.items, self.beg + beg, self.beg + max(beg, end), self.getter)
+
+        if val < 0:
+            val += len(self)
+        if not 0 <= val < len(self):
+            raise IndexError("EntryView index out of range")
+
+        item = self.items[self.beg + val]
+        return item if self.getter is None else self.getter(item)
+
+    def __iter__(self):
+        for idx in range(self.beg, self.end):
+            item = self.items[idx]
+            yield item if self.getter is None else self.getter(item)
+
+    def __repr__(self):
+        return f"EntryView(entries={len(self)})"
+
+
 class FastaReader:
     """Class that is used for parsing FASTA files. Contains function to conduct
     simple edits.
@@ -33,12 +265,15 @@ class FastaReader:
     parameters
     ----------
     filename:  str
-        path that leads to FASTA file
+        path that leads to FASTA file, plain or gzip/BGZF compressed
 
 
     methods
     -------
     reverse(fasta_entry):method return reversed sequences along with its position
+    stream(filename):method yields FastaEntry objects without loading the whole file
+    group_by_scaffold():method returns views over the entries of every scaffold
+    get_scaffold(scaffold_id):method returns a view over the entries of a scaffold
     """
 
     def __init__(self, filename):
@@ -61,24 +296,55 @@ class FastaReader:
             )
         pass
 
+    @staticmethod
+    def stream(filename):
+        """Yields FastaEntry objects one at a time without loading the whole
+        file into memory. See iter_fasta()
+        """
+        return iter_fasta(filename)
+
     def group_by_scaffold(self) -> dict:
-        """Groups all entries based on a scaffold
+        """Groups all entries based on a scaffold. Groups are views over the
+        scaffold index built while parsing, no entries are copied.
 
         Returns
         -------
         dict
-            scafold and FastaEntries as key value pairs
+            scafold and EntryView of its FastaEntries as key value pairs
 
         """
-        grouped_entries = defaultdict(list)
-        for entry in self.entries:
-            grouped_entries[entry.scaffold_id].append(entry)
+        return {scaffold: self.get_scaffold(scaffold) for scaffold in self.scaffold_ids}
 
-        return grouped_entries
+    def get_scaffold(self, scaffold_id) -> EntryView:
+        """Returns a view over the entries of a scaffold
+
+        Parameters
+        ----------
+        scaffold_id : str
+            scaffold id
+
+        Returns
+        -------
+        EntryView
+            entries of the scaffold, in file order
+
+        Raises
+        ------
+        KeyError
+            raised if the scaffold is not found
+        """
+        beg, end = self.scaffold_ranges[scaffold_id]
+        return EntryView(self.scaffold_entries, beg, end)
 
     # -----------------
     # Private functions
     # -----------------
+    def _iter_entries(self):
+        """Yields the entries of the file, overridden by readers of other
+        formats (see FastqReader)
+        """
+        return iter_fasta(self.filename)
+
     def __parse_fasta(self):
         """Parses Fasta files and returns a list of FastaEntry objects
 
@@ -97,32 +363,17 @@ class FastaReader:
         FormatError
             raised if input file is not a FASTA file
         """
-        with open(self.filename, "r") as f:
-            data = f.readlines()
-            if not data[0].startswith(">"):
-                raise FormatError("Invalid FASTA file")
-
-            raw_entries = [tuple(data[i : i + 2]) for i in range(0, len(data), 2)]
-
-            entries = []
-            scaffold_set = set()
-            for header, seq in raw_entries:
-
-                # removing unwanted formating
-                header_id = header.strip().replace("\n", "").replace(">", "")
-                scaffold_id = header.split(":")[0].replace(">", "")
-                seq = seq.strip().replace("\n", "")
-
-                # Collecting data and converting it into FastaEntry type
-                entry = FastaEntry(header_id, scaffold_id, seq)
-                entries.append(entry)
-
-                scaffold_set.add(scaffold_id)
+        entries = list(self._iter_entries())
+        order, scaffold_ranges = build_scaffold_index(
+            [entry.scaffold_id for entry in entries]
+        )
 
         self.entries = entries
         self.n_entries = len(entries)
-        self.scaffold_ids = list(scaffold_set)
-        self.n_scaffolds = len(list(scaffold_set))
+        self.scaffold_entries = [entries[idx] for idx in order]
+        self.scaffold_ranges = scaffold_ranges
+        self.scaffold_ids = list(scaffold_ranges.keys())
+        self.n_scaffolds = len(scaffold_ranges)
 
     # ---------------------
     # class attributes
@@ -144,6 +395,9 @@ class FastaReader:
 
     # Allow python functionallity support
     # -- indexing and iterating support
+    def __len__(self):
+        return self.n_entries
+
     def __iter__(self):
         return self
 
@@ -166,3 +420,279 @@ class FastaReader:
 
     def __str__(self):
         return f"FastaReader: Filename: '{self.filename}' has {self.n_entries} entries"
+
+
+def build_fasta_index(filename) -> dict:
+    """Scans a FASTA file once and records the byte offset, length and line
+    width of every entry (same layout as samtools faidx).
+
+    Parameters
+    ----------
+    filename : str
+        path to FASTA file
+
+    Returns
+    -------
+    dict
+        header_id and FaidxRecord as key value pairs
+
+    Raises
+    ------
+    FormatError
+        raised if input file is not a FASTA file or if an entry has sequence
+        lines of inconsistent length
+    """
+    index = {}
+    record = None
+    offset = 0
+    with open(filename, "rb") as f:
+        for line in f:
+            line_size = len(line)
+            if line.startswith(b">"):
+                if record is not None:
+                    index[record[0]] = FaidxRecord(*record[:5])
+                header_id = line.strip().decode().replace(">", "")
+
+                # [header_id, length, offset, line_bases, line_width, ended]
+                record = [header_id, 0, offset + line_size, 0, 0, False]
+                offset += line_size
+                continue
+
+            n_bases = len(line.rstrip())
+            offset += line_size
+            if record is None:
+                if n_bases == 0:
+                    continue
+                raise FormatError("Invalid FASTA file")
+
+            # only the last sequence line of an entry can be shorter
+            if record[5] and n_bases > 0:
+                raise FormatError(
+                    f"Entry {record[0]} has sequence lines of different lengths"
+                )
+            if record[3] == 0:
+                record[3] = n_bases
+                record[4] = line_size
+            elif n_bases > record[3]:
+                raise FormatError(
+                    f"Entry {record[0]} has sequence lines of different lengths"
+                )
+            if n_bases < record[3] or n_bases == 0:
+                record[5] = True
+            record[1] += n_bases
+
+    if record is not None:
+        index[record[0]] = FaidxRecord(*record[:5])
+
+    return index
+
+
+def write_fasta_index(index: dict, index_path: str):
+    """Writes a FASTA index into a tab delimited file
+
+    Parameters
+    ----------
+    index : dict
+        header_id and FaidxRecord as key value pairs
+    index_path : str
+        path where the index file is written
+    """
+    with open(index_path, "w") as outfile:
+        for record in index.values():
+            outfile.write("\t".join([str(value) for value in record]) + "\n")
+
+
+def load_fasta_index(index_path: str) -> dict:
+    """Loads a FASTA index written by write_fasta_index()
+
+    Parameters
+    ----------
+    index_path : str
+        path to index file
+
+    Returns
+    -------
+    dict
+        header_id and FaidxRecord as key value pairs
+    """
+    index = {}
+    with open(index_path, "r") as infile:
+        for line in infile:
+            header_id, *values = line.rstrip("\n").split("\t")
+            index[header_id] = FaidxRecord(header_id, *[int(v) for v in values])
+
+    return index
+
+
+class IndexedFastaReader:
+    """Random access reader for FASTA files. An index containing the byte
+    offset of every entry is built once and stored next to the FASTA file
+    (<filename>.fai). Sequences are then served by slicing a memory map of
+    the file, so entries are never loaded all at once.
+
+    parameters
+    ----------
+    filename:  str
+        path that leads to FASTA file
+    index_path: str, optional
+        path to the index file, by default <filename>.fai
+
+    methods
+    -------
+    fetch(header_id, start, end):method returns a subsequence of an entry
+    group_by_scaffold():method returns lazy views over the entries of every scaffold
+    get_scaffold(scaffold_id):method returns a lazy view over the entries of a scaffold
+    close():method closes the memory mapped file
+
+    Raises
+    ------
+    FormatError
+        raised if the FASTA file is compressed
+    """
+
+    def __init__(self, filename, index_path=None):
+        self.filename = filename
+        self.index_path = index_path
+        if detect_compression(filename) is not None:
+            raise FormatError(
+                f"{filename} is compressed, random access requires an uncompressed FASTA file"
+            )
+        if index_path is None:
+            self.index_path = f"{filename}.fai"
+
+        # reusing index if it is not older than the FASTA file
+        index_exists = os.path.exists(self.index_path)
+        if index_exists and os.path.getmtime(self.index_path) >= os.path.getmtime(
+            filename
+        ):
+            self.index = load_fasta_index(self.index_path)
+        else:
+            self.index = build_fasta_index(filename)
+            write_fasta_index(self.index, self.index_path)
+
+        self.ids = list(self.index.keys())
+        self.n_entries = len(self.ids)
+
+        # header ids are grouped by scaffold, entries are fetched when accessed
+        order, self.scaffold_ranges = build_scaffold_index(
+            [parse_scaffold_id(header_id) for header_id in self.ids]
+        )
+        self.scaffold_headers = [self.ids[idx] for idx in order]
+        self.scaffold_ids = list(self.scaffold_ranges.keys())
+
+        self.__file = open(filename, "rb")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def fetch(self, header_id, start=0, end=None) -> str:
+        """Returns the subsequence [start, end) of an entry
+
+        Parameters
+        ----------
+        header_id : str
+            FASTA header of the entry
+        start : int, optional
+            0-based start position, by default 0
+        end : int, optional
+            0-based exclusive end position. If None, the end of the sequence
+            is used, by default None
+
+        Returns
+        -------
+        str
+            subsequence
+
+        Raises
+        ------
+        KeyError
+            raised if the header_id is not found in the index
+        """
+        record = self.index[header_id]
+        if end is None or end > record.length:
+            end = record.length
+        start = max(start, 0)
+        if start >= end:
+            return ""
+
+        beg_byte = self.__byte_position(record, start)
+        end_byte = self.__byte_position(record, end - 1) + 1
+        raw_seq = self.__mmap[beg_byte:end_byte]
+
+        # removing line breaks of wrapped sequences
+        if end_byte - beg_byte != end - start:
+            raw_seq = raw_seq.replace(b"\n", b"").replace(b"\r", b"")
+
+        return raw_seq.decode()
+
+    def group_by_scaffold(self) -> dict:
+        """Groups all entries based on a scaffold. Entries are only fetched
+        from the file when they are accessed.
+
+        Returns
+        -------
+        dict
+            scaffold and EntryView of its FastaEntries as key value pairs
+        """
+        return {scaffold: self.get_scaffold(scaffold) for scaffold in self.scaffold_ids}
+
+    def get_scaffold(self, scaffold_id) -> EntryView:
+        """Returns a lazy view over the entries of a scaffold
+
+        Parameters
+        ----------
+        scaffold_id : str
+            scaffold id
+
+        Returns
+        -------
+        EntryView
+            entries of the scaffold, in file order
+
+        Raises
+        ------
+        KeyError
+            raised if the scaffold is not found
+        """
+        beg, end = self.scaffold_ranges[scaffold_id]
+        return EntryView(self.scaffold_headers, beg, end, getter=self.__getitem__)
+
+    def close(self):
+        """Closes the memory mapped FASTA file"""
+        self.__mmap.close()
+        self.__file.close()
+
+    # -----------------
+    # Private functions
+    # -----------------
+    @staticmethod
+    def __byte_position(record, pos):
+        """Converts a sequence position into a byte position in the file"""
+        line_idx, line_pos = divmod(pos, record.line_bases)
+        return record.offset + line_idx * record.line_width + line_pos
+
+    # Allow python functionallity support
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.n_entries
+
+    def __contains__(self, header_id):
+        return header_id in self.index
+
+    def __iter__(self):
+        for header_id in self.ids:
+            yield self[header_id]
+
+    def __getitem__(self, header_id):
+        scaffold_id = parse_scaffold_id(header_id)
+        return FastaEntry(header_id, scaffold_id, self.fetch(header_id))
+
+    # -- printing support
+    def __repr__(self):
+        return f"IndexedFastaReader(filename={self.filename}, entries={self.n_entries})"
+
+    def __str__(self):
+        return f"IndexedFastaReader: Filename: '{self.filename}' has {self.n_entries} entries"
@@ -0,0 +1,253 @@
+# ------------------------------
+# read_store.py
+#
+# Module containing a compact columnar storage for parsed reads.
+# All sequences are kept in a single contiguous byte buffer and reads
+# are described by offset and length arrays.
+# ------------------------------
+from array import array
+import numpy as np
+
+# genequest imports
+from genequest.io_handler.parser import FastaEntry, iter_fasta
+from genequest.common.utils import lengths_to_offsets
+
+
+class ReadStore:
+    """Columnar storage of reads. Sequences and headers are stored in two
+    contiguous byte buffers and each read is described by its offset and
+    length within these buffers. Scaffold ids are interned and stored as an
+    integer code per read.
+
+    Reads are only converted into FastaEntry objects when they are accessed,
+    which allows the store to be used by functions that expect FastaEntry
+    objects (e.g. run_de_bruijn)
+
+    parameters
+    ----------
+    seq_data : np.ndarray
+        uint8 array containing all sequences
+    offsets : np.ndarray
+        start position of each sequence in seq_data
+    lengths : np.ndarray
+        length of each sequence
+    header_data : np.ndarray
+        uint8 array containing all header ids
+    header_offsets : np.ndarray
+        start position of each header id in header_data
+    header_lengths : np.ndarray
+        length of each header id
+    scaffold_codes : np.ndarray
+        index of each read's scaffold id in scaffold_ids
+    scaffold_ids : list
+        unique scaffold ids
+
+    methods
+    -------
+    from_entries(entries):method creates a ReadStore from FastaEntry objects
+    from_fasta(filename):method creates a ReadStore by streaming a FASTA file
+    take(indices):method returns a ReadStore view of the selected reads
+    compact():method returns a copy of the store with contiguous buffers
+    group_by_scaffold():method groups reads by scaffold
+    """
+
+    def __init__(
+        self,
+        seq_data,
+        offsets,
+        lengths,
+        header_data,
+        header_offsets,
+        header_lengths,
+        scaffold_codes,
+        scaffold_ids,
+    ):
+        self.seq_data = seq_data
+        self.offsets = offsets
+        self.lengths = lengths
+        self.header_data = header_data
+        self.header_offsets = header_offsets
+        self.header_lengths = header_lengths
+        self.scaffold_codes = scaffold_codes
+        self.scaffold_ids = scaffold_ids
+        self.n_entries = len(offsets)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Creates a ReadStore from an iterable of FastaEntry objects
+
+        Parameters
+        ----------
+        entries : iterable
+            FastaEntry objects
+
+        Returns
+        -------
+        ReadStore
+            columnar storage of the entries
+        """
+        seq_data = bytearray()
+        header_data = bytearray()
+        lengths = array("q")
+        header_lengths = array("q")
+        scaffold_codes = array("l")
+        scaffold_lookup = {}
+
+        for entry in entries:
+            seq = entry.seq.encode()
+            header = entry.header_id.encode()
+            seq_data += seq
+            header_data += header
+            lengths.append(len(seq))
+            header_lengths.append(len(header))
+
+            # interning scaffold ids
+            code = scaffold_lookup.get(entry.scaffold_id)
+            if code is None:
+                code = len(scaffold_lookup)
+                scaffold_lookup[entry.scaffold_id] = code
+            scaffold_codes.append(code)
+
+        lengths = np.array(lengths, dtype=np.int64)
+        header_lengths = np.array(header_lengths, dtype=np.int64)
+
+        return cls(
+            seq_data=np.frombuffer(bytes(seq_data), dtype=np.uint8),
+            offsets=lengths_to_offsets(lengths),
+            lengths=lengths,
+            header_data=np.frombuffer(bytes(header_data), dtype=np.uint8),
+            header_offsets=lengths_to_offsets(header_lengths),
+            header_lengths=header_lengths,
+            scaffold_codes=np.array(scaffold_codes, dtype=np.int32),
+            scaffold_ids=list(scaffold_lookup.keys()),
+        )
+
+    @classmethod
+    def from_fasta(cls, filename):
+        """Creates a ReadStore by streaming a FASTA file. FastaEntry objects
+        are only created one at a time while parsing.
+
+        Parameters
+        ----------
+        filename : str
+            path to FASTA file
+
+        Returns
+        -------
+        ReadStore
+            columnar storage of the FASTA entries
+        """
+        return cls.from_entries(iter_fasta(filename))
+
+    def get_seq(self, idx) -> str:
+        """Returns the sequence of a single read"""
+        beg = self.offsets[idx]
+        return self.seq_data[beg : beg + self.lengths[idx]].tobytes().decode()
+
+    def get_header(self, idx) -> str:
+        """Returns the header id of a single read"""
+        beg = self.header_offsets[idx]
+        return self.header_data[beg : beg + self.header_lengths[idx]].tobytes().decode()
+
+    def take(self, indices):
+        """Returns a ReadStore containing the selected reads. Sequence and
+        header buffers are shared with the current store.
+
+        Parameters
+        ----------
+        indices : np.ndarray, slice
+            indices of the reads to select
+
+        Returns
+        -------
+        ReadStore
+            view of the selected reads
+        """
+        return ReadStore(
+            seq_data=self.seq_data,
+            offsets=self.offsets[indices],
+            lengths=self.lengths[indices],
+            header_data=self.header_data,
+            header_offsets=self.header_offsets[indices],
+            header_lengths=self.header_lengths[indices],
+            scaffold_codes=self.scaffold_codes[indices],
+            scaffold_ids=self.scaffold_ids,
+        )
+
+    def compact(self):
+        """Returns a ReadStore whose buffers only contain the reads of the
+        current store. Views created with take() share the buffers of the
+        whole store, compacting them first keeps serialized stores (e.g. when
+        sent to other processes) small.
+
+        Returns
+        -------
+        ReadStore
+            store with contiguous buffers
+        """
+        seq_data, offsets = _gather(self.seq_data, self.offsets, self.lengths)
+        header_data, header_offsets = _gather(
+            self.header_data, self.header_offsets, self.header_lengths
+        )
+        return ReadStore(
+            seq_data=seq_data,
+            offsets=offsets,
+            lengths=self.lengths.copy(),
+            header_data=header_data,
+            header_offsets=header_offsets,
+            header_lengths=self.header_lengths.copy(),
+            scaffold_codes=self.scaffold_codes.copy(),
+            scaffold_ids=self.scaffold_ids,
+        )
+
+    def group_by_scaffold(self) -> dict:
+        """Groups all reads based on a scaffold
+
+        Returns
+        -------
+        dict
+            scaffold and ReadStore views as key value pairs
+        """
+        order = np.argsort(self.scaffold_codes, kind="stable")
+        codes, starts = np.unique(self.scaffold_codes[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+
+        grouped_reads = {}
+        for code, beg, end in zip(codes, starts, stops):
+            grouped_reads[self.scaffold_ids[code]] = self.take(order[beg:end])
+
+        return grouped_reads
+
+    # Allow python functionallity support
+    # -- indexing and iterating support
+    def __len__(self):
+        return self.n_entries
+
+    def __iter__(self):
+        for idx in range(self.n_entries):
+            yield self[idx]
+
+    def __getitem__(self, val):
+        if isinstance(val, slice):
+            return self.take(val)
+
+        header_id = self.get_header(val)
+        scaffold_id = self.scaffold_ids[self.scaffold_codes[val]]
+        return FastaEntry(header_id, scaffold_id, self.get_seq(val))
+
+    # -- printing support
+    def __repr__(self):
+        return f"ReadStore(entries={self.n_entries}, scaffolds={len(self.scaffold_ids)})"
+
+    def __str__(self):
+        return f"ReadStore: {self.n_entries} entries ({self.seq_data.nbytes} bytes of sequence data)"
+
+
+def _gather(data, offsets, lengths):
+    """Copies the selected segments of a buffer into a new contiguous buffer
+    and returns it along with the new offsets
+    """
+    new_offsets = lengths_to_offsets(lengths)
+    positions = np.arange(lengths.sum(), dtype=np.int64)
+    positions += np.repeat(offsets - new_offsets, lengths)
+    return data[positions], new_offsets
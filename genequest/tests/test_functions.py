@@ -1,17 +1,61 @@
 from cmath import exp
 import unittest
 import logging
+import os
 import random
+import tempfile
+import types
+import gzip
+import struct
+import zlib
+from collections import Counter
 import numpy as np
 
 # genequest imports
-from genequest.io_handler.parser import FastaEntry, FastaReader
+from genequest.io_handler.parser import (
+    FastaEntry,
+    FastaReader,
+    IndexedFastaReader,
+    group_by_scaffold,
+    iter_fasta,
+)
+from genequest.io_handler.fastq import FastqReader, quality_trim_lengths
+from genequest.io_handler.read_store import ReadStore
+from genequest.common.errors import FormatError, NoNodesFoundError
+from genequest.io_handler.contig_store import ContigStore, ContigStoreWriter
+from genequest.io_handler.cache import AssemblyCache
+from genequest.common.encoding import (
+    PackedSequence,
+    iter_kmers,
+    kmer_to_int,
+    int_to_kmer,
+    decode_kmers,
+)
+from genequest.analysis.kmer_counter import count_kmers, extract_kmers
+from genequest.analysis.assembler import (
+    create_bruijn_graph,
+    compact_unitigs,
+    generate_contig,
+    run_de_bruijn,
+)
 from genequest.analysis.alignment import (
+    QueryProfile,
+    affine_trace_back,
+    banded_alignment,
+    best_alignment_score,
     generate_scoring_matrix,
+    match_scoring,
     score_alignment,
     trace_back,
     parse_traceback_scores,
+    realign_best_region,
+    run_local_alignment,
+    score_affine_alignment,
+    seed_diagonal,
+    trace_alignment,
 )
+from genequest.analysis.seed_index import SeedIndex, seed_and_extend
+from genequest.analysis.recruitment import recruit_reads, sequence_minimizers
 
 # ====================
 # data generator functions
@@ -23,6 +67,21 @@ def generate_random_seq(n_nucleotides):
     return random_dna_seq
 
 
+def write_bgzf(path, data, block_size=100):
+    """Writes data into BGZF blocks of block_size bytes followed by the
+    empty end of file block
+    """
+    with open(path, "wb") as outfile:
+        for beg in list(range(0, len(data), block_size)) + [len(data)]:
+            block = data[beg : beg + block_size]
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            deflated = compressor.compress(block) + compressor.flush()
+            header = (31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, len(deflated) + 25)
+            outfile.write(struct.pack("<4BI2BH2BHH", *header))
+            outfile.write(deflated)
+            outfile.write(struct.pack("<II", zlib.crc32(block), len(block)))
+
+
 class ParserFunctions(unittest.TestCase):
 
     # creating a stdout logger
@@ -211,6 +270,412 @@ class ParserFunctions(unittest.TestCase):
             self.fail("Iteration could to be conducted with FastaReader object")
         self.logger.info("FastaReader Iteration Test: PASSED")
 
+    def test_FastaReader_stream(self):
+        """Tests streaming entries from a FASTA file"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+        stream = FastaReader.stream("./test_data/test_fasta_seq.fasta")
+
+        # the stream is lazy and must yield the same entries as the reader
+        try:
+            self.assertTrue(isinstance(stream, types.GeneratorType))
+            streamed_entries = [str(entry) for entry in stream]
+            self.assertEqual([str(entry) for entry in reader.entries], streamed_entries)
+        except:
+            self.logger.error("FastaReader Stream Test: FAILED")
+            self.fail("Streamed entries are not the same as the parsed entries")
+        self.logger.info("FastaReader Stream Test: PASSED")
+
+    def test_FastaReader_wrapped(self):
+        """Tests parsing FASTA files with sequences wrapped at 60 columns"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+        wrapped_reader = FastaReader("./test_data/test_wrapped_seq.fasta")
+
+        # small chunks force records to be split across chunk boundaries
+        chunked_entries = iter_fasta("./test_data/test_wrapped_seq.fasta", chunk_size=7)
+
+        expected_entries = [str(entry) for entry in reader.entries]
+        try:
+            self.assertEqual(expected_entries, [str(e) for e in wrapped_reader.entries])
+            self.assertEqual(expected_entries, [str(e) for e in chunked_entries])
+        except:
+            self.logger.error("FastaReader Wrapped Test: FAILED")
+            self.fail("Wrapped sequences were not joined correctly")
+        self.logger.info("FastaReader Wrapped Test: PASSED")
+
+    def test_IndexedFastaReader(self):
+        """Tests random access of FASTA entries through an offset index"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fasta_file in ["test_fasta_seq.fasta", "test_wrapped_seq.fasta"]:
+                index_path = os.path.join(tmp_dir, f"{fasta_file}.fai")
+                indexed_reader = IndexedFastaReader(
+                    f"./test_data/{fasta_file}", index_path=index_path
+                )
+
+                try:
+                    self.assertTrue(os.path.exists(index_path))
+                    self.assertEqual(reader.n_entries, len(indexed_reader))
+                    for entry in reader.entries:
+                        indexed_entry = indexed_reader[entry.header_id]
+                        self.assertEqual(str(entry), str(indexed_entry))
+                        self.assertEqual(
+                            entry.seq[55:130],
+                            indexed_reader.fetch(entry.header_id, 55, 130),
+                        )
+                except:
+                    self.logger.error("IndexedFastaReader Test: FAILED")
+                    self.fail("Indexed entries are not the same as the parsed entries")
+                finally:
+                    indexed_reader.close()
+
+        self.logger.info("IndexedFastaReader Test: PASSED")
+
+    def test_FastaReader_compressed(self):
+        """Tests parsing gzip and BGZF compressed FASTA files"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+        with open("./test_data/test_fasta_seq.fasta", "rb") as infile:
+            data = infile.read()
+
+        expected_entries = [str(entry) for entry in reader.entries]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gzip_path = os.path.join(tmp_dir, "reads.fasta.gz")
+            bgzf_path = os.path.join(tmp_dir, "reads.fasta.bgz")
+            with gzip.open(gzip_path, "wb") as outfile:
+                outfile.write(data)
+            write_bgzf(bgzf_path, data)
+
+            # invalid deflate block type in the first BGZF block
+            corrupt_path = os.path.join(tmp_dir, "corrupt.fasta.bgz")
+            with open(bgzf_path, "rb") as infile:
+                corrupt_data = bytearray(infile.read())
+            corrupt_data[18] = 0xFF
+            with open(corrupt_path, "wb") as outfile:
+                outfile.write(corrupt_data)
+
+            try:
+                self.assertEqual(expected_entries, [str(e) for e in FastaReader(gzip_path)])
+                self.assertEqual(expected_entries, [str(e) for e in FastaReader(bgzf_path)])
+                self.assertEqual(
+                    expected_entries,
+                    [str(e) for e in iter_fasta(bgzf_path, chunk_size=7, threads=2)],
+                )
+                with self.assertRaises(FormatError):
+                    IndexedFastaReader(bgzf_path)
+                with self.assertRaises(FormatError):
+                    FastaReader(corrupt_path)
+            except:
+                self.logger.error("FastaReader Compressed Test: FAILED")
+                self.fail("Compressed entries are not the same as the parsed entries")
+        self.logger.info("FastaReader Compressed Test: PASSED")
+
+    def test_FastqReader(self):
+        """Tests parsing and quality trimming FASTQ files"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+
+        # high quality reads with a low quality tail on every other read
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fastq_path = os.path.join(tmp_dir, "reads.fastq")
+            with open(fastq_path, "w") as outfile:
+                for idx, entry in enumerate(reader.entries):
+                    qual = "I" * len(entry)
+                    if idx % 2 == 0:
+                        qual = qual[:-10] + "#" * 10
+                    outfile.write(f"@{entry.header_id}\n{entry.seq}\n+\n{qual}\n")
+
+            fastq_reader = FastqReader(fastq_path)
+            trimmed_reader = FastqReader(fastq_path, min_quality=20, window_size=1)
+
+        quals = np.array([40, 40, 2, 40, 40, 40, 40, 40, 2, 2], dtype=np.int64)
+        trimmed_lengths = quality_trim_lengths(quals, np.array([5, 5]), 20, window_size=2)
+
+        try:
+            self.assertEqual(
+                [(e.header_id, e.seq) for e in reader],
+                [(e.header_id, e.seq) for e in fastq_reader],
+            )
+            self.assertEqual(reader.group_by_scaffold().keys(), fastq_reader.group_by_scaffold().keys())
+            for idx, (entry, trimmed) in enumerate(zip(reader, trimmed_reader)):
+                expected_length = len(entry) - 10 if idx % 2 == 0 else len(entry)
+                self.assertEqual(entry.seq[:expected_length], trimmed.seq)
+                self.assertEqual(expected_length, len(trimmed.qual))
+            self.assertEqual([5, 3], trimmed_lengths.tolist())
+        except:
+            self.logger.error("FastqReader Test: FAILED")
+            self.fail("FASTQ entries are not parsed or trimmed correctly")
+        self.logger.info("FastqReader Test: PASSED")
+
+    def test_scaffold_index(self):
+        """Tests grouping entries through the scaffold index built while parsing"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+        expected_groups = {
+            scaffold: [str(entry) for entry in entries]
+            for scaffold, entries in group_by_scaffold(reader.entries).items()
+        }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index_path = os.path.join(tmp_dir, "test_fasta_seq.fasta.fai")
+            with IndexedFastaReader(
+                "./test_data/test_fasta_seq.fasta", index_path=index_path
+            ) as indexed_reader:
+                indexed_groups = {
+                    scaffold: [str(entry) for entry in entries]
+                    for scaffold, entries in indexed_reader.group_by_scaffold().items()
+                }
+
+        test_groups = {
+            scaffold: [str(entry) for entry in entries]
+            for scaffold, entries in reader.group_by_scaffold().items()
+        }
+        group = reader.get_scaffold("IDIDID")
+
+        try:
+            self.assertEqual(list(expected_groups.keys()), reader.scaffold_ids)
+            self.assertEqual(expected_groups, test_groups)
+            self.assertEqual(expected_groups, indexed_groups)
+            self.assertEqual(expected_groups["IDIDID"][1:], [str(e) for e in group[1:]])
+            self.assertEqual(expected_groups["IDIDID"][-1], str(group[-1]))
+            self.assertTrue(group[0].scaffold_id is group[-1].scaffold_id)
+        except:
+            self.logger.error("Scaffold Index Test: FAILED")
+            self.fail("Scaffold index groups are not the same as the grouped entries")
+        self.logger.info("Scaffold Index Test: PASSED")
+
+    def test_ReadStore(self):
+        """Tests columnar storage of reads"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+        store = ReadStore.from_fasta("./test_data/test_fasta_seq.fasta")
+
+        expected_groups = {
+            scaffold: [str(entry) for entry in entries]
+            for scaffold, entries in reader.group_by_scaffold().items()
+        }
+        test_groups = {
+            scaffold: [str(entry) for entry in entries]
+            for scaffold, entries in store.group_by_scaffold().items()
+        }
+
+        try:
+            self.assertEqual(reader.n_entries, len(store))
+            self.assertEqual(
+                [str(entry) for entry in reader.entries], [str(entry) for entry in store]
+            )
+            self.assertEqual(str(reader[4]), str(store[4]))
+            self.assertEqual(str(reader[-1]), str(store[2:][-1]))
+            self.assertEqual(expected_groups, test_groups)
+
+            # compacted views only hold the sequences of their own reads
+            group = store.group_by_scaffold()["IDIDID"].compact()
+            self.assertEqual(group.lengths.sum(), len(group.seq_data))
+            self.assertEqual(expected_groups["IDIDID"], [str(entry) for entry in group])
+        except:
+            self.logger.error("ReadStore Test: FAILED")
+            self.fail("ReadStore entries are not the same as the parsed entries")
+        self.logger.info("ReadStore Test: PASSED")
+
+
+class EncodingFunctions(unittest.TestCase):
+    """tests 2-bit nucleotide encoding"""
+
+    # creating a stdout logger
+    logger = logging.getLogger(__name__)
+    logging.basicConfig(
+        format="%(asctime)s %(module)s %(levelname)s: %(message)s",
+        datefmt="%m/%d/%Y %I:%M:%S %p",
+        level=logging.INFO,
+    )
+
+    def test_packed_sequence(self):
+        """Tests packing and unpacking sequences with ambiguous nucleotides"""
+        seq = generate_random_seq(101)
+        ambiguous_seq = seq[:40] + "N" + seq[41:]
+
+        packed_seq = PackedSequence(seq)
+        packed_ambiguous_seq = PackedSequence(ambiguous_seq)
+
+        try:
+            self.assertEqual(seq, str(packed_seq))
+            self.assertEqual(ambiguous_seq, str(packed_ambiguous_seq))
+            self.assertEqual(26, packed_seq.nbytes)
+            self.assertEqual(101, len(packed_ambiguous_seq))
+        except:
+            self.logger.error("Packed Sequence Test: FAILED")
+            self.fail("Sequence could not be restored from its packed representation")
+        self.logger.info("Packed Sequence Test: PASSED")
+
+    def test_rolling_kmers(self):
+        """Tests kmer integer representation computed by rolling shifts"""
+        k = 5
+        seq = "ACGTTGCANNACGTACC"
+        expected_kmers = [
+            (i, kmer_to_int(seq[i : i + k]))
+            for i in range(len(seq) - k + 1)
+            if "N" not in seq[i : i + k]
+        ]
+
+        test_kmers = list(iter_kmers(seq, k))
+
+        try:
+            self.assertEqual(expected_kmers, test_kmers)
+            self.assertEqual(kmer_to_int("ACGTT"), 0b0001101111)
+            self.assertEqual("TTGCA", int_to_kmer(kmer_to_int("TTGCA"), k))
+        except:
+            self.logger.error("Rolling Kmer Test: FAILED")
+            self.fail("Kmers obtained by rolling shifts are not correct")
+        self.logger.info("Rolling Kmer Test: PASSED")
+
+
+class AssemblyFunctions(unittest.TestCase):
+    """tests kmer counting and de bruijn graph assembly"""
+
+    # creating a stdout logger
+    logger = logging.getLogger(__name__)
+    logging.basicConfig(
+        format="%(asctime)s %(module)s %(levelname)s: %(message)s",
+        datefmt="%m/%d/%Y %I:%M:%S %p",
+        level=logging.INFO,
+    )
+
+    def test_kmer_counting(self):
+        """Tests vectorized kmer counting against string kmers"""
+        k = 7
+        reads = FastaReader("./test_data/test_fasta_seq.fasta").entries
+        store = ReadStore.from_entries(reads)
+
+        expected_counts = Counter(
+            read.seq[i : i + k] for read in reads for i in range(len(read) - k + 1)
+        )
+        kmers, counts = count_kmers(reads, k)
+        test_counts = dict(zip(decode_kmers(kmers, k), counts.tolist()))
+
+        # grouped ReadStore views must be gathered from the shared buffer
+        scaffold_reads = store.group_by_scaffold()["IDIDID"]
+        expected_scaffold_kmers = [
+            kmer_to_int(read.seq[i : i + k])
+            for read in scaffold_reads
+            for i in range(len(read) - k + 1)
+        ]
+
+        try:
+            self.assertEqual(dict(expected_counts), test_counts)
+            self.assertEqual(
+                expected_scaffold_kmers, extract_kmers(scaffold_reads, k).tolist()
+            )
+        except:
+            self.logger.error("Kmer Counting Test: FAILED")
+            self.fail("Kmer counts are not the same as the expected counts")
+        self.logger.info("Kmer Counting Test: PASSED")
+
+    def test_bruijn_graph(self):
+        """Tests node degrees and edge multiplicities of the de bruijn graph"""
+        k = 3
+        reads = [
+            FastaEntry("S1:1", "S1", "ACGTACGA"),
+            FastaEntry("S1:2", "S1", "CGTACC"),
+        ]
+
+        graph = create_bruijn_graph(reads, k)
+        test_edges = {}
+        for node in range(graph.n_nodes):
+            beg, end = graph.indptr[node], graph.indptr[node + 1]
+            test_edges[graph.label(node)] = [
+                (graph.label(target), int(count))
+                for target, count in zip(
+                    graph.targets[beg:end], graph.multiplicity[beg:end]
+                )
+            ]
+
+        expected_edges = {
+            "ACG": [("CGA", 1), ("CGT", 1)],
+            "CGT": [("GTA", 2)],
+            "GTA": [("TAC", 2)],
+            "TAC": [("ACC", 1), ("ACG", 1)],
+            "ACC": [],
+            "CGA": [],
+        }
+
+        try:
+            self.assertEqual(expected_edges, test_edges)
+            self.assertEqual(1, graph.indegree[graph.node_id("ACG")])
+            self.assertEqual(2, graph.outdegree[graph.node_id("ACG")])
+            self.assertEqual(2, graph.indegree[graph.node_id("GTA")])
+            self.assertEqual(1, graph.indegree[graph.node_id("ACC")])
+            self.assertEqual(0, graph.outdegree[graph.node_id("ACC")])
+            self.assertEqual([], graph.start_nodes().tolist())
+        except:
+            self.logger.error("De Bruijn Graph Test: FAILED")
+            self.fail("Graph nodes and edges are not the expected ones")
+        self.logger.info("De Bruijn Graph Test: PASSED")
+
+    def test_run_de_bruijn(self):
+        """Tests assembling contigs from the reads of each scaffold"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+
+        # reads of the IDIDID scaffold do not overlap, so each read is
+        # assembled into its own contig
+        expected_contigs = sorted(
+            [entry.seq for entry in reader.group_by_scaffold()["IDIDID"]]
+        )
+        contigs = run_de_bruijn(reader, k=15)
+        test_contigs = sorted(contigs["IDIDID"].values())
+
+        try:
+            self.assertEqual(["2S43D", "IDIDID"], sorted(contigs.keys()))
+            self.assertEqual(expected_contigs, test_contigs)
+        except:
+            self.logger.error("De Bruijn Assembly Test: FAILED")
+            self.fail("Assembled contigs are not the expected ones")
+        self.logger.info("De Bruijn Assembly Test: PASSED")
+
+    def test_run_de_bruijn_workers(self):
+        """Tests that parallel assembly returns the serial results"""
+        reader = FastaReader("./test_data/test_fasta_seq.fasta")
+        serial_contigs = run_de_bruijn(reader, k=15)
+        parallel_contigs = run_de_bruijn(reader, k=15, workers=2)
+
+        try:
+            self.assertEqual(list(serial_contigs.keys()), list(parallel_contigs.keys()))
+            self.assertEqual(serial_contigs, parallel_contigs)
+        except:
+            self.logger.error("Parallel Assembly Test: FAILED")
+            self.fail("Parallel assembly does not return the serial contigs")
+        self.logger.info("Parallel Assembly Test: PASSED")
+
+    def test_eulerian_contig(self):
+        """Tests that eulerian trails splice cycles into the contig"""
+        # CGC -> GCG -> CGC is a cycle that a simple walk skips
+        seq = "TAAATCGCGCCG"
+        reads = [FastaEntry("S1:1", "S1", seq)]
+
+        walk_contigs = run_de_bruijn(reads, k=3)
+        eulerian_contigs = run_de_bruijn(reads, k=3, eulerian=True)
+
+        try:
+            self.assertEqual("TAAATCGCCG", walk_contigs["S1"]["conting1"])
+            self.assertEqual(seq, eulerian_contigs["S1"]["conting1"])
+        except:
+            self.logger.error("Eulerian Contig Test: FAILED")
+            self.fail("Eulerian trail did not use all edges of the graph")
+        self.logger.info("Eulerian Contig Test: PASSED")
+
+    def test_compact_unitigs(self):
+        """Tests that non-branching paths are collapsed into unitigs"""
+        seq = "TAAATCGCGCCG"
+        graph = create_bruijn_graph([FastaEntry("S1:1", "S1", seq)], k=3)
+        unitigs = compact_unitigs(graph)
+
+        try:
+            # TAA -> ... -> TCG, CGC, GCG, GCC -> CCG
+            self.assertEqual(4, unitigs.n_unitigs)
+            start_node = graph.node_id("TAA")
+            self.assertEqual(
+                generate_contig(graph, start_node), generate_contig(unitigs, start_node)
+            )
+        except:
+            self.logger.error("Unitig Compaction Test: FAILED")
+            self.fail("Compacted graph does not produce the same contig")
+        self.logger.info("Unitig Compaction Test: PASSED")
+
 
 class RunTime(unittest.TestCase):
     """testes all functions and cases when assembling"""
@@ -277,6 +742,55 @@ class RunTime(unittest.TestCase):
 
         self.logger.info("Local Alignment Test: PASSED")
 
+    def test_vectorized_alignment_score(self):
+        """Tests that the vectorized scoring matrix is identical to the
+        cell by cell recurrence
+        """
+        query = "ACGTTGCANACGTAGGCT"
+        contig = "TTACGTAGCAACGTTAGGCTNACG"
+        gap, match, mismatch = -3, 7, -2
+
+        expected_alignment_score = generate_scoring_matrix(len(contig) + 1, len(query) + 1)
+        for i in range(1, len(contig) + 1):
+            for j in range(1, len(query) + 1):
+                expected_alignment_score[i, j] = max(
+                    expected_alignment_score[i, j - 1] + gap,
+                    expected_alignment_score[i - 1, j] + gap,
+                    expected_alignment_score[i - 1, j - 1]
+                    + match_scoring(contig[i - 1], query[j - 1], match, mismatch),
+                    0,
+                )
+
+        test_alignment_score = score_alignment(query, contig, gap, match, mismatch)
+
+        try:
+            self.assertTrue(np.array_equal(expected_alignment_score, test_alignment_score))
+        except:
+            self.logger.error("Vectorized Alignment Test: FAILED")
+            self.fail("Vectorized scoring matrix does not match the recurrence")
+        self.logger.info("Vectorized Alignment Test: PASSED")
+
+    def test_best_alignment_score(self):
+        """Tests that the query profile scan finds the maximum of the scoring
+        matrix, including rows that no longer fit into int16 scores
+        """
+        query = "ACGTTGCANACGTAGGCT"
+        contigs = ["TTACGTAGCAACGTTAGGCTNACG", "GGGG", "", query * 3]
+
+        try:
+            for gap, match, mismatch in [(-5, 10, -4), (-3, 3000, -2)]:
+                profile = QueryProfile(query, gap, match, mismatch)
+                for contig in contigs:
+                    score_matrix = score_alignment(query, contig, gap, match, mismatch)
+                    x, y = np.unravel_index(score_matrix.argmax(), score_matrix.shape)
+                    self.assertEqual(
+                        (score_matrix.max(), x, y), best_alignment_score(profile, contig)
+                    )
+        except:
+            self.logger.error("Query Profile Alignment Test: FAILED")
+            self.fail("Best score does not match the scoring matrix")
+        self.logger.info("Query Profile Alignment Test: PASSED")
+
     def test_traceback(self):
         """Tests for tracing back along the local alignment scoring
         matrix to find the best alignment
@@ -303,7 +817,7 @@ class RunTime(unittest.TestCase):
 
         # construct scoring matrix
         test_alignment_matrix = score_alignment(contig, query)
-        trace_back_data = trace_back(test_alignment_matrix)
+        trace_back_data = trace_back(test_alignment_matrix, gap=-5)
         test_positions, test_scores = trace_back_data
         test_complete_results = parse_traceback_scores(trace_back_data)
 
@@ -339,3 +853,350 @@ class RunTime(unittest.TestCase):
             self.logger.error("Traceback Test - traceback parser: FAILED")
             self.fail("Resulting data not match")
         self.logger.info("Traceback Test - traceback parser: PASSED")
+
+    def test_realign_best_region(self):
+        """Tests tracing back the best alignment from its re-aligned region"""
+        contig = "ACCACGTATT"
+        query = "ACG"
+
+        # the best region is traced back in whole matrix coordinates
+        expected_traceback = trace_back(score_alignment(contig, query), gap=-5)
+        test_traceback = realign_best_region(contig, "TT" + query)
+        expected_position = [(x + 2, y) for x, y in expected_traceback[0]]
+
+        try:
+            self.assertEqual(expected_position, test_traceback[0])
+            self.assertEqual(expected_traceback[1], test_traceback[1])
+        except:
+            self.logger.error("Region Traceback Test: FAILED")
+            self.fail("Re-aligned region did not produce the expected traceback")
+        self.logger.info("Region Traceback Test: PASSED")
+
+    def test_affine_alignment(self):
+        """Tests affine gap scoring and traceback across the gap states"""
+        query = "ACGTACGTTTGCAGCA"
+        contig = "ACGTACGTGCAGCA"
+
+        # equal open and extend scores are the same as linear gaps
+        linear_matrix = score_alignment(query, contig, gap=-5)
+        test_matrix = score_affine_alignment(query, contig, gap_open=-5, gap_extend=-5)[0]
+
+        # the two missing nucleotides form a single gap: 14 matches - 8 - 1
+        score_matrices = score_affine_alignment(query, contig, gap_open=-8, gap_extend=-1)
+        positions, scores = affine_trace_back(score_matrices, gap_open=-8, gap_extend=-1)
+
+        try:
+            self.assertTrue(np.array_equal(linear_matrix, test_matrix))
+            self.assertEqual(131.0, scores[0])
+            self.assertEqual((len(contig), len(query)), positions[0])
+            self.assertEqual((0, 0), positions[-1])
+            self.assertIn((8, 9), positions)
+            with self.assertRaises(ValueError):
+                score_affine_alignment(query, contig, gap_open=-1, gap_extend=-8)
+        except:
+            self.logger.error("Affine Alignment Test: FAILED")
+            self.fail("Affine alignment did not produce the expected alignment")
+        self.logger.info("Affine Alignment Test: PASSED")
+
+    def test_direction_traceback(self):
+        """Tests tracing back with the direction matrix recorded while
+        scoring
+        """
+        contig = "ACCACGTATT"
+        query = "ACG"
+        expected_position, expected_scores = (
+            [(3, 6), (2, 5), (1, 4), (0, 3)],
+            [30.0, 20.0, 10.0, 0.0],
+        )
+
+        score_matrix, directions = score_alignment(contig, query, return_directions=True)
+        test_positions, test_scores = trace_back(score_matrix, directions)
+
+        # the 2 nucleotides missing from the contig are an insertion
+        alignment = trace_alignment(
+            *score_alignment("ACGTACGTTTGCAGCA", "ACGTACGTGCAGCA", return_directions=True)
+        )
+
+        try:
+            self.assertEqual(np.uint8, directions.dtype)
+            self.assertEqual(expected_position, test_positions)
+            self.assertEqual(expected_scores, test_scores)
+            self.assertEqual((0, 14, 0, 16), tuple(alignment[:4]))
+            self.assertEqual(130.0, alignment.score)
+            self.assertEqual("7M2I7M", alignment.cigar)
+        except:
+            self.logger.error("Direction Traceback Test: FAILED")
+            self.fail("Direction matrix traceback did not produce the expected alignment")
+        self.logger.info("Direction Traceback Test: PASSED")
+
+    def test_inferred_directions(self):
+        """Tests that directions inferred with the sequences follow the
+        recorded diagonal-first tie-break, and that the score-only inference
+        (gaps first on ties) still traces an optimal path
+        """
+        random.seed(11)
+        for _ in range(200):
+            query = generate_random_seq(random.randint(1, 25))
+            contig = generate_random_seq(random.randint(1, 25))
+            score_matrix, directions = score_alignment(
+                query, contig, return_directions=True
+            )
+            expected_traceback = trace_back(score_matrix, directions)
+            inferred_traceback = trace_back(
+                score_matrix, gap=-5, query=query, contig=contig, match=10, mismatch=-4
+            )
+            score_only_traceback = trace_back(score_matrix, gap=-5)
+
+            try:
+                self.assertEqual(expected_traceback, inferred_traceback)
+                with self.assertRaises(ValueError):
+                    trace_back(score_matrix)
+                with self.assertRaises(ValueError):
+                    trace_back(score_matrix, gap=-5, query=query, contig=contig)
+                self.assertEqual(expected_traceback[1][0], score_only_traceback[1][0])
+                self.assertEqual(0.0, score_only_traceback[1][-1])
+            except:
+                self.logger.error("Inferred Directions Test: FAILED")
+                self.fail("Inferred directions do not follow the recorded tie-break")
+        self.logger.info("Inferred Directions Test: PASSED")
+
+    def test_banded_alignment(self):
+        """Tests aligning inside a band around the seeded diagonal"""
+        random.seed(42)
+        contig = generate_random_seq(400)
+        query = contig[250:300] + contig[305:350]
+
+        expected_alignment = trace_alignment(
+            *score_alignment(query, contig, return_directions=True)
+        )
+        test_alignment = banded_alignment(query, contig, band_width=8)
+
+        # diagonals outside of the matrix are moved to its closest corner
+        below_alignment = banded_alignment(query, contig, band_width=8, diagonal=-1000)
+        corner_alignment = banded_alignment(query, contig, band_width=8, diagonal=-400)
+        above_alignment = banded_alignment(query, contig, band_width=8, diagonal=1000)
+
+        try:
+            self.assertEqual(-250, seed_diagonal(query, contig))
+            self.assertEqual(expected_alignment, test_alignment)
+            self.assertEqual(corner_alignment, below_alignment)
+            self.assertTrue(np.isfinite(below_alignment.score))
+            self.assertTrue(np.isfinite(above_alignment.score))
+            self.assertEqual(250, test_alignment.contig_beg)
+            self.assertEqual(350, test_alignment.contig_end)
+        except:
+            self.logger.error("Banded Alignment Test: FAILED")
+            self.fail("Banded alignment did not find the best alignment")
+        self.logger.info("Banded Alignment Test: PASSED")
+
+    def test_seed_index(self):
+        """Tests that only contigs sharing seeds with the query are aligned"""
+        random.seed(7)
+        contigs = {
+            "S1": {"conting1": generate_random_seq(300), "conting2": generate_random_seq(300)},
+            "S2": {"conting1": generate_random_seq(300)},
+        }
+        query = contigs["S2"]["conting1"][100:180]
+
+        index = SeedIndex.from_contigs(contigs, k=11)
+        candidates = index.find_candidates(query, min_hits=5)
+        candidate_contigs = index.candidate_contigs(query, min_hits=5)
+        results = seed_and_extend(query, index, min_hits=5)
+
+        try:
+            self.assertEqual(3, index.n_contigs)
+            self.assertEqual([(2, -100, 70)], candidates)
+            self.assertEqual({"S2": contigs["S2"]}, dict(candidate_contigs))
+            self.assertEqual(1, len(results))
+            self.assertEqual(("S2", "conting1"), results[0][:2])
+            self.assertEqual((100, 180), (results[0][2].contig_beg, results[0][2].contig_end))
+        except:
+            self.logger.error("Seed Index Test: FAILED")
+            self.fail("Seed index did not find the contig containing the query")
+        self.logger.info("Seed Index Test: PASSED")
+
+    def test_recruit_reads(self):
+        """Tests recruiting the reads that share minimizers with a query"""
+        random.seed(11)
+        genomes = {"S1": generate_random_seq(1000), "S2": generate_random_seq(1000)}
+        reads = [
+            FastaEntry(f"{scaffold}:{beg}", scaffold, genome[beg : beg + 100])
+            for scaffold, genome in genomes.items()
+            for beg in range(0, 900, 50)
+        ]
+        query = genomes["S2"][400:600]
+
+        recruited = recruit_reads(query, reads, k=15, w=10)
+        extended = recruit_reads(query, reads, k=15, w=10, rounds=1)
+        scaffolds = recruit_reads(query, reads, k=15, w=10, keep_scaffolds=True)
+        unrelated = recruit_reads(generate_random_seq(200), reads, k=15, w=10)
+
+        try:
+            self.assertTrue(len(sequence_minimizers(query, 15, 10)) > 0)
+            self.assertEqual(
+                ["S2:350", "S2:400", "S2:450", "S2:500", "S2:550"],
+                [entry.header_id for entry in recruited],
+            )
+            self.assertEqual(
+                ["S2:300", "S2:350", "S2:400", "S2:450", "S2:500", "S2:550", "S2:600"],
+                [entry.header_id for entry in extended],
+            )
+            self.assertEqual(18, len(scaffolds))
+            self.assertEqual(["S2"], scaffolds.scaffold_ids)
+            self.assertEqual(0, len(unrelated))
+            with self.assertRaises(NoNodesFoundError):
+                run_de_bruijn(unrelated, 11)
+        except:
+            self.logger.error("Read Recruitment Test: FAILED")
+            self.fail("Recruited reads are not the ones overlapping the query")
+        self.logger.info("Read Recruitment Test: PASSED")
+
+    def test_run_local_alignment(self):
+        """Tests aligning a query against a batch of contigs"""
+        random.seed(3)
+        contigs = {
+            "S1": {"conting1": generate_random_seq(200), "conting2": generate_random_seq(80)},
+            "S2": {"conting1": generate_random_seq(150)},
+        }
+        query = contigs["S1"]["conting2"][10:60]
+
+        results = run_local_alignment(query, contigs)
+        top_results = run_local_alignment(query, contigs, top_n=2)
+        expected_alignment = trace_alignment(
+            *score_alignment(query, contigs["S1"]["conting2"], return_directions=True)
+        )
+
+        try:
+            self.assertEqual(3, len(results))
+            self.assertEqual(sorted(results["score"], reverse=True), list(results["score"]))
+            self.assertEqual(["S1", "conting2"], list(results.iloc[0][:2]))
+            self.assertEqual(list(expected_alignment), list(results.iloc[0][2:]))
+            self.assertEqual((10, 60, 500.0), tuple(results.iloc[0][["contig_beg", "contig_end", "score"]]))
+            self.assertTrue(results.head(2).equals(top_results))
+            with self.assertRaises(ValueError):
+                run_local_alignment(query, contigs, top_n=0)
+        except:
+            self.logger.error("Local Alignment Batch Test: FAILED")
+            self.fail("Batched alignment did not return the expected table")
+        self.logger.info("Local Alignment Batch Test: PASSED")
+
+    def test_parallel_local_alignment(self):
+        """Tests that parallel alignment returns the serial results"""
+        random.seed(5)
+        contigs = [generate_random_seq(random.randint(50, 300)) for _ in range(12)]
+        query = contigs[4][20:70]
+
+        serial_results = run_local_alignment(query, contigs, top_n=5)
+        parallel_results = run_local_alignment(query, contigs, top_n=5, threads=2)
+
+        try:
+            self.assertEqual(4, parallel_results.iloc[0]["contig_id"])
+            self.assertTrue(serial_results.equals(parallel_results))
+        except:
+            self.logger.error("Parallel Alignment Test: FAILED")
+            self.fail("Parallel alignment does not return the serial results")
+        self.logger.info("Parallel Alignment Test: PASSED")
+
+    def test_contig_store(self):
+        """Tests writing and lazily reading contigs from a contig store"""
+        random.seed(8)
+        contigs = {
+            "S1": {"conting1": generate_random_seq(37), "conting2": "ACGTNNACGTRA"},
+            "S2": {},
+            "S3": {"conting1": generate_random_seq(120)},
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "contigs.gqc")
+            with ContigStoreWriter(path) as writer:
+                for scaffold, scaffold_contigs in contigs.items():
+                    writer.add_scaffold(scaffold, scaffold_contigs)
+
+            with ContigStore(path) as store:
+                scaffold_ids = list(store)
+                s3_contigs = store.get_contigs("S3")
+                all_contigs = store.to_dict()
+
+        try:
+            self.assertEqual(["S1", "S2", "S3"], scaffold_ids)
+            self.assertEqual(contigs["S3"], dict(s3_contigs))
+            self.assertEqual({}, dict(all_contigs["S2"]))
+            self.assertEqual(contigs["S1"]["conting1"], all_contigs["S1"]["conting1"])
+            self.assertEqual("ACGTNNACGTNA", all_contigs["S1"]["conting2"])
+        except:
+            self.logger.error("Contig Store Test: FAILED")
+            self.fail("Contig store does not return the written contigs")
+        self.logger.info("Contig Store Test: PASSED")
+
+    def test_assembly_cache(self):
+        """Tests that cached runs only reassemble the scaffolds that changed"""
+        random.seed(9)
+        genomes = {"S1": generate_random_seq(200), "S2": generate_random_seq(200)}
+
+        def write_reads(path):
+            with open(path, "w") as outfile:
+                for scaffold, genome in genomes.items():
+                    for pos in range(0, 160, 20):
+                        outfile.write(f">{scaffold}:{pos}\n{genome[pos : pos + 40]}\n")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reads_path = os.path.join(tmpdir, "reads.fasta")
+            cache = AssemblyCache(os.path.join(tmpdir, "cache"))
+
+            write_reads(reads_path)
+            expected = run_de_bruijn(FastaReader(reads_path), 11)
+            first_run = run_de_bruijn(FastaReader(reads_path), 11, cache=cache)
+            second_run = run_de_bruijn(FastaReader(reads_path), 11, cache=cache)
+            n_entries = len(list(cache.scaffold_dir.iterdir()))
+
+            genomes["S2"] = generate_random_seq(200)
+            write_reads(reads_path)
+            changed_run = run_de_bruijn(FastaReader(reads_path), 11, cache=cache)
+            n_changed_entries = len(list(cache.scaffold_dir.iterdir()))
+
+            cache.max_size = 0
+            cache.evict()
+            n_evicted_entries = len(list(cache.scaffold_dir.iterdir()))
+
+        try:
+            self.assertEqual(dict(expected), dict(first_run))
+            self.assertEqual(dict(expected), dict(second_run))
+            self.assertEqual(expected["S1"], changed_run["S1"])
+            self.assertEqual(2, n_entries)
+            self.assertEqual(3, n_changed_entries)
+            self.assertEqual(0, n_evicted_entries)
+        except:
+            self.logger.error("Assembly Cache Test: FAILED")
+            self.fail("Cached assembly does not reuse unchanged scaffolds")
+        self.logger.info("Assembly Cache Test: PASSED")
+
+    def test_assembly_cache_trimming(self):
+        """Tests that cached runs are not reused across FASTQ trimming settings"""
+        random.seed(10)
+        genome = generate_random_seq(200)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reads_path = os.path.join(tmpdir, "reads.fastq")
+            cache = AssemblyCache(os.path.join(tmpdir, "cache"))
+
+            # the end of the genome is only covered by a low quality tail
+            with open(reads_path, "w") as outfile:
+                for pos in range(0, 170, 20):
+                    qual = "I" * 20 + ("#" if pos == 160 else "I") * 20
+                    outfile.write(f"@S1:{pos}\n{genome[pos : pos + 40]}\n+\n{qual}\n")
+
+            untrimmed = run_de_bruijn(FastqReader(reads_path), 11)
+            trimmed = run_de_bruijn(FastqReader(reads_path, min_quality=20), 11)
+            cached_untrimmed = run_de_bruijn(FastqReader(reads_path), 11, cache=cache)
+            cached_trimmed = run_de_bruijn(
+                FastqReader(reads_path, min_quality=20), 11, cache=cache
+            )
+
+        try:
+            self.assertNotEqual(dict(untrimmed), dict(trimmed))
+            self.assertEqual(dict(untrimmed), dict(cached_untrimmed))
+            self.assertEqual(dict(trimmed), dict(cached_trimmed))
+        except:
+            self.logger.error("Assembly Cache Trimming Test: FAILED")
+            self.fail("Cached assembly ignores the FASTQ trimming settings")
+        self.logger.info("Assembly Cache Trimming Test: PASSED")